@@ -1,11 +1,13 @@
-import requests
+import threading
+import time
 
+import http_client
 
-def get_next_airing_episode(anime_title: str):
-    url = "https://graphql.anilist.co"
-    query = """
-    query ($search: String) {
-        Media(search: $search, type: ANIME) {
+ANILIST_URL = "https://graphql.anilist.co"
+# Titles per aliased query; AniList rejects queries above its complexity limit
+ANILIST_CHUNK_SIZE = 10
+
+MEDIA_FIELDS = """
             id
             title {
                 romaji
@@ -15,26 +17,98 @@ def get_next_airing_episode(anime_title: str):
                 airingAt
                 episode
             }
-        }
+"""
+
+# title (lowercased) -> (episode info, unix time the cached answer expires)
+_airing_cache = {}
+_airing_cache_lock = threading.Lock()
+
+
+def _episode_info(anime_title: str, media):
+    if not media or not media["nextAiringEpisode"]:
+        return {"message": f"No upcoming episodes found for {anime_title}."}
+    return {
+        "title": media["title"]["romaji"] or media["title"]["english"],
+        "airing_at": media["nextAiringEpisode"]["airingAt"],
+        "episode": media["nextAiringEpisode"]["episode"]
+    }
+
+
+def get_next_airing_episode(anime_title: str):
+    query = """
+    query ($search: String) {
+        Media(search: $search, type: ANIME) {""" + MEDIA_FIELDS + """        }
     }
     """
     variables = {"search": anime_title}
     try:
-        response = requests.post(url, json={'query': query, 'variables': variables})
+        response = http_client.post(ANILIST_URL, json={'query': query, 'variables': variables})
         if response.status_code == 200:
             data = response.json()
-            media = data["data"]["Media"]
-            if not media["nextAiringEpisode"]:
-                return {"message": f"No upcoming episodes found for {anime_title}."}
-            airing_at = media["nextAiringEpisode"]["airingAt"]
-            episode = media["nextAiringEpisode"]["episode"]
-            return {
-                "title": media["title"]["romaji"] or media["title"]["english"],
-                "airing_at": airing_at,
-                "episode": episode
-            }
+            return _episode_info(anime_title, data["data"]["Media"])
         else:
             return {"message": "Failed to fetch anime details from AniList."}
     except Exception as e:
         print(f"Error fetching data: {e}")
-        return {"message": "An error occurred while fetching anime details."}
\ No newline at end of file
+        return {"message": "An error occurred while fetching anime details."}
+
+
+def _fetch_airing_chunk(titles):
+    """Looks up several titles with one aliased GraphQL query."""
+    variables = {f"s{i}": title for i, title in enumerate(titles)}
+    declarations = ", ".join(f"${name}: String" for name in variables)
+    selections = "".join(
+        f"\n        m{i}: Media(search: $s{i}, type: ANIME) {{{MEDIA_FIELDS}        }}"
+        for i in range(len(titles))
+    )
+    query = f"query ({declarations}) {{{selections}\n    }}"
+
+    response = http_client.post(ANILIST_URL, json={'query': query, 'variables': variables})
+    # A title that is not found makes AniList answer 404 for the whole query,
+    # but the other aliases are still filled in under "data"
+    data = response.json().get("data") if response.content else None
+    if data is None:
+        print(f"Failed to fetch anime details from AniList: {response.status_code}")
+        return {title: {"message": "Failed to fetch anime details from AniList."} for title in titles}
+
+    return {title: _episode_info(title, data.get(f"m{i}")) for i, title in enumerate(titles)}
+
+
+def get_next_airing_episodes(anime_titles):
+    """
+    Returns the next airing episode for many titles, keyed by title.
+
+    Uncached titles are looked up ANILIST_CHUNK_SIZE per request. An answer is
+    cached until its episode airs, since it cannot change before then; titles
+    without an upcoming episode are cached for an hour.
+    """
+    now = time.time()
+    results = {}
+    missing = []
+    with _airing_cache_lock:
+        for title in dict.fromkeys(anime_titles):
+            cached = _airing_cache.get(title.lower())
+            if cached and cached[1] > now:
+                results[title] = cached[0]
+            else:
+                missing.append(title)
+
+    for start in range(0, len(missing), ANILIST_CHUNK_SIZE):
+        try:
+            chunk_results = _fetch_airing_chunk(missing[start:start + ANILIST_CHUNK_SIZE])
+        except Exception as e:
+            print(f"Error fetching data: {e}")
+            chunk_results = {
+                title: {"message": "An error occurred while fetching anime details."}
+                for title in missing[start:start + ANILIST_CHUNK_SIZE]
+            }
+
+        with _airing_cache_lock:
+            for title, info in chunk_results.items():
+                results[title] = info
+                if "airing_at" in info:
+                    _airing_cache[title.lower()] = (info, info["airing_at"])
+                elif "No upcoming episodes" in info["message"]:
+                    _airing_cache[title.lower()] = (info, now + 3600)
+
+    return results
@@ -1,36 +1,162 @@
 import os
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import httplib2
+
+import metrics
+
+# The Google SDKs are imported inside the functions that use them: they are
+# slow to import and most processes only need them once the first Calendar
+# call is made.
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 CREDENTIALS_FILE = os.path.join(os.path.dirname(__file__), 'credentials.json')
-TOKEN_FILE = os.path.join(os.path.dirname(__file__), 'token.json')
+TOKEN_FILE = os.getenv("GOOGLE_TOKEN_FILE", os.path.join(os.path.dirname(__file__), 'token.json'))
+# Alternative Calendar API root, e.g. a local stand-in for benchmarks
+CALENDAR_API_ROOT = os.getenv("CALENDAR_API_ROOT")
 
-def authenticate_google_calendar():
-    try:
-        creds = None
+# Refresh the access token this long before it actually expires, so no request
+# ever goes out with a token that dies mid-flight.
+REFRESH_MARGIN = timedelta(minutes=5)
+HTTP_TIMEOUT = 30
+
+
+def load_credentials():
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    creds = None
+
+    if os.path.exists(TOKEN_FILE):
+        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
 
-        if os.path.exists(TOKEN_FILE):
-            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+                save_credentials(creds)
+            else:
+                os.remove(TOKEN_FILE)
+                creds = None
 
-            if not creds or not creds.valid:
-                if creds and creds.expired and creds.refresh_token:
-                    creds.refresh(Request())
-                else:
-                    os.remove(TOKEN_FILE)
-                    creds = None
+    if not creds:
+        flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
+        creds = flow.run_local_server(port=0)
+        save_credentials(creds)
 
-        if not creds:
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
+    return creds
 
-            with open(TOKEN_FILE, 'w') as token:
-                token.write(creds.to_json())
 
+def save_credentials(creds):
+    with open(TOKEN_FILE, 'w') as token:
+        token.write(creds.to_json())
+
+
+def authenticate_google_calendar():
+    from googleapiclient.discovery import build
+
+    try:
+        creds = load_credentials()
         service = build('calendar', 'v3', credentials=creds)
         return service
 
     except Exception as e:
         print(f"An error occurred during authentication: {e}")
+
+
+def _calendar_operation(method, uri):
+    """Names a Calendar API call after its REST method, without event ids."""
+    path = urlsplit(uri).path
+    if path.endswith('/batch/calendar/v3'):
+        return 'batch'
+    if path.endswith('/freeBusy'):
+        return 'freebusy'
+    if path.endswith('/instances'):
+        return 'instances'
+    if path.endswith('/events'):
+        return {'GET': 'list', 'POST': 'insert'}.get(method, method.lower())
+    if '/events/' in path:
+        return {'GET': 'get', 'PUT': 'update', 'PATCH': 'patch', 'DELETE': 'delete'}.get(method, method.lower())
+    return method.lower()
+
+
+class InstrumentedHttp(httplib2.Http):
+    """httplib2.Http that records latency and status of every Calendar API call."""
+
+    def request(self, uri, method="GET", *args, **kwargs):
+        with metrics.track_upstream('calendar', _calendar_operation(method, uri)) as call:
+            response, content = super().request(uri, method, *args, **kwargs)
+            call.status = response.status
+        return response, content
+
+
+class CalendarClient:
+    """
+    Process-wide holder for the Google Calendar service.
+
+    Credentials are loaded once and refreshed under a lock shortly before they
+    expire. httplib2 connections are not thread-safe, so every worker thread
+    gets its own service object (and keep-alive connection pool), built from a
+    discovery document that is parsed only once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._creds = None
+        self._discovery_doc = None
+        self.stats = {"credential_loads": 0, "refreshes": 0, "builds": 0}
+
+    def _needs_refresh(self):
+        if not self._creds.valid:
+            return True
+        # google-auth stores expiry as a naive UTC datetime
+        expiry = self._creds.expiry
+        return expiry is not None and expiry - datetime.utcnow() < REFRESH_MARGIN
+
+    def credentials(self):
+        with self._lock:
+            if self._creds is None:
+                self._creds = load_credentials()
+                self.stats["credential_loads"] += 1
+            if self._needs_refresh() and self._creds.refresh_token:
+                from google.auth.transport.requests import Request
+                self._creds.refresh(Request())
+                save_credentials(self._creds)
+                self.stats["refreshes"] += 1
+            return self._creds
+
+    def service(self):
+        creds = self.credentials()
+        service = getattr(self._local, "service", None)
+        if service is not None:
+            return service
+
+        from google_auth_httplib2 import AuthorizedHttp
+        from googleapiclient.discovery import build, build_from_document
+
+        http = AuthorizedHttp(creds, http=InstrumentedHttp(timeout=HTTP_TIMEOUT))
+        with self._lock:
+            if self._discovery_doc is None:
+                document = build('calendar', 'v3', http=http, cache_discovery=False)._rootDesc
+                if CALENDAR_API_ROOT:
+                    # rootUrl is also what batch requests are sent to
+                    root = CALENDAR_API_ROOT.rstrip('/') + '/'
+                    document = {**document, 'rootUrl': root, 'baseUrl': root + document['servicePath']}
+                self._discovery_doc = document
+            service = build_from_document(self._discovery_doc, http=http)
+            self.stats["builds"] += 1
+
+        self._local.service = service
+        return service
+
+    def reset(self):
+        """Drop cached credentials and services, e.g. after re-authenticating."""
+        with self._lock:
+            self._creds = None
+            self._local = threading.local()
+
+
+calendar_client = CalendarClient()
@@ -0,0 +1,311 @@
+"""
+Local stand-ins for every API the service talks to.
+
+One threaded HTTP server emulates Google Calendar (including batch requests),
+Gemini, TMDB, AniList, MangaDex, zenquotes, api-ninjas, muffinlabs,
+OpenWeatherMap, the Spotify playlist scheduler and the Vonage SMS API. Each upstream lives under
+its own path prefix and can be given extra latency and an error rate.
+
+Run on its own with `python benchmarks/fake_upstreams.py --port 9100`, or let
+run_benchmarks.py start it.
+"""
+import argparse
+import email.parser
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+UPSTREAMS = [
+    "google", "gemini", "tmdb", "anilist", "mangadex", "zenquotes",
+    "api-ninjas", "muffinlabs", "openweathermap", "spotify", "vonage",
+]
+
+# Real host -> path prefix on the fake server, for http_client.UPSTREAM_OVERRIDES
+HOST_PREFIXES = {
+    "api.themoviedb.org": "tmdb",
+    "graphql.anilist.co": "anilist",
+    "api.mangadex.org": "mangadex",
+    "zenquotes.io": "zenquotes",
+    "api.api-ninjas.com": "api-ninjas",
+    "history.muffinlabs.com": "muffinlabs",
+    "api.openweathermap.org": "openweathermap",
+    "127.0.0.1:8000": "spotify",
+    "rest.nexmo.com": "vonage",
+}
+
+
+class Faults:
+    """Per-upstream latency (seconds, with +/- jitter) and error rate."""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, overrides=None):
+        self.default = (latency, jitter, error_rate)
+        self.overrides = overrides or {}
+
+    def for_upstream(self, upstream):
+        return self.overrides.get(upstream, self.default)
+
+
+class CalendarState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = {}
+        self.ids = itertools.count(1)
+
+    def handle(self, method, path, query, body):
+        match = re.match(r"^/calendar/v3/calendars/primary/events(?:/([^/]+))?(/instances)?$", path)
+        if path == "/calendar/v3/freeBusy" and method == "POST":
+            return 200, {"calendars": {"primary": {"busy": []}}}
+        if not match:
+            return 404, {"error": {"code": 404, "message": f"Unknown path {path}"}}
+
+        event_id, instances = match.groups()
+        with self.lock:
+            if event_id is None and method == "GET":
+                items = [] if "syncToken" in query else list(self.events.values())[:250]
+                return 200, {"items": items, "nextSyncToken": "fake-sync-token"}
+            if event_id is None and method == "POST":
+                event = {**body, "id": f"fake{next(self.ids)}", "status": "confirmed"}
+                self.events[event["id"]] = event
+                return 200, event
+            if event_id not in self.events:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            if instances:
+                return 200, {"items": [self.events[event_id]]}
+            if method == "GET":
+                return 200, self.events[event_id]
+            if method in ("PUT", "PATCH"):
+                base = {} if method == "PUT" else self.events[event_id]
+                self.events[event_id] = {**base, **body, "id": event_id, "status": "confirmed"}
+                return 200, self.events[event_id]
+            if method == "DELETE":
+                del self.events[event_id]
+                return 204, None
+        return 405, {"error": {"code": 405, "message": "Method not allowed"}}
+
+    def handle_batch(self, content_type, raw_body):
+        """Answers a Google multipart/mixed batch request, one part per call."""
+        message = email.parser.Parser().parsestr(f"Content-Type: {content_type}\r\n\r\n" + raw_body.decode())
+        boundary = "batch_fake_boundary"
+        parts = []
+        for part in message.get_payload():
+            request_head, _, body = part.get_payload().replace("\r\n", "\n").partition("\n\n")
+            method, target = request_head.split(" ")[:2]
+            split = urlsplit(target)
+            # Item paths carry the /google prefix of CALENDAR_API_ROOT, like top-level requests
+            path = split.path[len("/google"):] if split.path.startswith("/google/") else split.path
+            status, data = self.handle(method, path, parse_qs(split.query), json.loads(body) if body.strip() else {})
+            content_id = part["Content-ID"].strip("<>")
+            payload = json.dumps(data) if data is not None else ""
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n\r\n{payload}\r\n"
+            )
+        body = "".join(parts) + f"--{boundary}--\r\n"
+        return f"multipart/mixed; boundary={boundary}", body.encode()
+
+
+def gemini_response(text="Fake coaching tip: single-task for the whole block."):
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}]}
+
+
+def fake_movies(page):
+    return {
+        "page": page,
+        "total_pages": 5,
+        "results": [
+            {
+                "id": page * 100 + i,
+                "title": f"Fake Movie {page}-{i}",
+                "release_date": "1994-06-01",
+                "vote_average": 7.5,
+                "vote_count": 1000,
+                "genre_ids": [28],
+            }
+            for i in range(20)
+        ],
+    }
+
+
+def fake_anilist(variables):
+    airing_at = int(time.time()) + 86400
+    media = {
+        "id": 1,
+        "title": {"romaji": "Fake Anime", "english": "Fake Anime"},
+        "nextAiringEpisode": {"airingAt": airing_at, "episode": 5},
+    }
+    if "search" in variables:
+        return {"data": {"Media": media}}
+    return {"data": {f"m{name[1:]}": media for name in variables}}
+
+
+def fake_forecast():
+    now = int(time.time())
+    return {
+        "list": [
+            {
+                "dt": now + i * 10800,
+                "main": {"temp": 12.0 + i % 5, "humidity": 70},
+                "weather": [{"description": "light rain"}],
+                "wind": {"speed": 4.2},
+            }
+            for i in range(40)
+        ]
+    }
+
+
+def make_handler(faults, calendar):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, data=None, content_type="application/json", raw=None):
+            body = raw if raw is not None else (json.dumps(data).encode() if data is not None else b"")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _route(self, method):
+            split = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw_body = self.rfile.read(length) if length else b""
+            query = parse_qs(split.query)
+
+            if ":generateContent" in split.path or ":streamGenerateContent" in split.path:
+                upstream, path = "gemini", split.path
+            else:
+                _, upstream, path = (split.path.split("/", 2) + [""])[:3]
+                path = "/" + path
+
+            latency, jitter, error_rate = faults.for_upstream(upstream)
+            delay = latency + random.uniform(-jitter, jitter)
+            if delay > 0:
+                time.sleep(delay)
+            if random.random() < error_rate:
+                return self._send(503, {"error": f"injected {upstream} failure"})
+
+            if upstream == "google":
+                if path == "/batch/calendar/v3":
+                    content_type, body = calendar.handle_batch(self.headers["Content-Type"], raw_body)
+                    return self._send(200, content_type=content_type, raw=body)
+                status, data = calendar.handle(method, path, query, json.loads(raw_body) if raw_body else {})
+                return self._send(status, data)
+            if upstream == "gemini":
+                if ":streamGenerateContent" in path:
+                    words = gemini_response()["candidates"][0]["content"]["parts"][0]["text"].split(" ")
+                    events = "".join(f"data: {json.dumps(gemini_response(word + ' '))}\r\n\r\n" for word in words)
+                    return self._send(200, content_type="text/event-stream", raw=events.encode())
+                return self._send(200, gemini_response())
+            if upstream == "tmdb":
+                return self._send(200, fake_movies(int(query.get("page", ["1"])[0])))
+            if upstream == "anilist":
+                return self._send(200, fake_anilist(json.loads(raw_body).get("variables", {})))
+            if upstream == "mangadex":
+                if path.startswith("/manga"):
+                    return self._send(200, {"data": [{"id": "fake-manga", "attributes": {"title": {"en": "Fake Manga"}}}]})
+                chapter = {
+                    "id": "fake-chapter",
+                    "attributes": {"title": "Fake Chapter", "chapter": "1", "publishAt": "2024-01-01T00:00:00+00:00"},
+                    "relationships": [{"type": "manga", "id": "fake-manga"}],
+                }
+                return self._send(200, {"data": [chapter], "total": 1})
+            if upstream == "zenquotes":
+                return self._send(200, [{"q": "Fake motivational quote.", "a": "Benchmark"}])
+            if upstream == "api-ninjas":
+                return self._send(200, [{"quote": "Fake mindfulness quote.", "author": "Benchmark"}])
+            if upstream == "muffinlabs":
+                return self._send(200, {"data": {"Events": [{"year": "1969", "text": "Fake historical event."}]}})
+            if upstream == "openweathermap":
+                if path.endswith("/forecast"):
+                    return self._send(200, fake_forecast())
+                return self._send(200, fake_forecast()["list"][0])
+            if upstream == "spotify":
+                if path == "/schedule-playlists":
+                    return self._send(200, {"scheduled": len(json.loads(raw_body).get("cues", []))})
+                return self._send(200, {"message": "scheduled"})
+            if upstream == "vonage":
+                return self._send(200, {"message-count": "1", "messages": [{"status": "0", "message-id": "fake"}]})
+            return self._send(404, {"error": f"no fake for {self.path}"})
+
+        def do_GET(self):
+            self._route("GET")
+
+        def do_POST(self):
+            self._route("POST")
+
+        def do_PUT(self):
+            self._route("PUT")
+
+        def do_PATCH(self):
+            self._route("PATCH")
+
+        def do_DELETE(self):
+            self._route("DELETE")
+
+    return Handler
+
+
+def start_fake_upstreams(port=0, faults=None):
+    """Starts the fake server in a daemon thread and returns it; server.server_port is the bound port."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(faults or Faults(), CalendarState()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def app_environment(port):
+    """Environment variables that point the service at a fake server on `port`."""
+    base = f"http://127.0.0.1:{port}"
+    return {
+        "UPSTREAM_OVERRIDES": json.dumps({host: f"{base}/{prefix}" for host, prefix in HOST_PREFIXES.items()}),
+        "CALENDAR_API_ROOT": f"{base}/google/",
+        "GEMINI_API_ENDPOINT": base,
+        "GEMINI_API_KEY": "benchmark",
+        "TMDB_API_KEY": "benchmark",
+        "WEATHER_API_KEY": "benchmark",
+        "API_NINJAS_KEY": "benchmark",
+        "VONAGE_API_KEY": "benchmark",
+        "VONAGE_API_SECRET": "benchmark",
+        "USER_PHONE_NUMBER": "31600000000",
+    }
+
+
+def parse_faults(args):
+    overrides = {}
+    for spec in args.upstream or []:
+        # name=latency_ms[:error_rate]
+        name, _, values = spec.partition("=")
+        latency_ms, _, error_rate = values.partition(":")
+        overrides[name] = (float(latency_ms) / 1000, args.jitter_ms / 1000, float(error_rate or 0))
+    return Faults(args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, overrides)
+
+
+def add_fault_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=20, help="Latency added to every upstream call")
+    parser.add_argument("--jitter-ms", type=float, default=5, help="Random +/- jitter on that latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls answered with 503")
+    parser.add_argument(
+        "--upstream", action="append", metavar="NAME=MS[:ERRORS]",
+        help=f"Per-upstream override, e.g. gemini=800 or tmdb=50:0.1. Names: {', '.join(UPSTREAMS)}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_fake_upstreams(args.port, parse_faults(args))
+    print(f"Fake upstreams listening on http://127.0.0.1:{server.server_port}")
+    for name, value in app_environment(server.server_port).items():
+        print(f"export {name}='{value}'")
+    threading.Event().wait()
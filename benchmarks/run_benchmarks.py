@@ -0,0 +1,233 @@
+"""
+Offline throughput/latency benchmark for the FastAPI app in main.py.
+
+Starts the fake upstreams, runs the app under uvicorn pointed at them, drives
+every scenario with a fixed number of concurrent clients and reports
+p50/p95/p99 latency and requests/sec per endpoint. Nothing leaves the machine.
+
+    python benchmarks/run_benchmarks.py --requests 200 --concurrency 16
+    python benchmarks/run_benchmarks.py --json after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+
+import aiohttp
+
+from fake_upstreams import add_fault_arguments, app_environment, parse_faults, start_fake_upstreams
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _future(hours):
+    # Quoted, or the "+" of the UTC offset arrives as a space
+    return quote((datetime.now(timezone.utc) + timedelta(hours=hours)).strftime("%Y-%m-%dT%H:%M:%S%z"))
+
+
+def scenarios():
+    start, end = _future(24), _future(25)
+    return [
+        ("events", "GET", "/events", None),
+        ("recommendations", "GET", "/recommendations", None),
+        ("create-event", "POST", f"/create-event?summary=Bench&start_time={start}&end_time={end}", None),
+        ("focus-blocks", "POST", f"/schedule-focus-blocks?num_blocks=3&start_time={start}", None),
+        ("free-slots", "GET", "/free-slots", None),
+        ("movie-session", "POST", f"/schedule-movie-session?start_time={start}&end_time={end}", None),
+        ("movie-session-ai", "POST", f"/schedule-movie-session?use_ai=true&start_time={start}&end_time={end}", None),
+        ("running-event", "POST", f"/schedule-running-event?city=Amsterdam&start_time={start}&end_time={end}", None),
+        ("motivational", "POST", f"/schedule-motivational-event?start_time={start}&end_time={end}", None),
+        ("motivational-ai", "POST", f"/schedule-motivational-event?use_ai=true&start_time={start}&end_time={end}", None),
+        ("mindfulness", "POST", f"/schedule-mindfulness-event?start_time={start}&end_time={end}", None),
+        ("mindfulness-cues", "POST", f"/schedule-mindfulness-event?start_time={start}&end_time={end}"
+         "&pre_event_track_uri=spotify:playlist:a&during_event_track_uri=spotify:playlist:b"
+         "&post_event_track_uri=spotify:playlist:c", None),
+        ("historical", "POST", f"/add-historical-event?start_time={start}&end_time={end}", None),
+        ("historical-ai", "POST", f"/add-historical-event?use_ai=true&start_time={start}&end_time={end}", None),
+        ("historical-stream", "POST", f"/add-historical-event/stream?start_time={start}&end_time={end}", None),
+        ("motivational-stream", "POST", f"/schedule-motivational-event/stream?start_time={start}&end_time={end}", None),
+        ("movie-session-stream", "POST", f"/schedule-movie-session/stream?start_time={start}&end_time={end}", None),
+        ("anime-episode", "POST", "/add-anime-episode?anime_title=Fake", None),
+        ("anime-episodes", "POST", "/add-anime-episodes", ["Fake A", "Fake B", "Fake C"]),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_scenario(session, base_url, method, path, body, total, concurrency):
+    latencies = []
+    first_bytes = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def client():
+        nonlocal errors
+        for _ in counter:
+            started = time.perf_counter()
+            try:
+                async with session.request(method, base_url + path, json=body) as response:
+                    # Time to first byte is what streaming (SSE) endpoints improve
+                    await response.content.readany()
+                    first_bytes.append((time.perf_counter() - started) * 1000)
+                    await response.read()
+                    # 207: some of the calendar writes in the request failed
+                    if response.status >= 400 or response.status == 207:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    first_bytes.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "ttfb_p50_ms": percentile(first_bytes, 0.50),
+    }
+
+
+async def run_all(base_url, selected, total, concurrency, warmup):
+    results = {}
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120)) as session:
+        for name, method, path, body in scenarios():
+            if selected and name not in selected:
+                continue
+            if warmup:
+                await run_scenario(session, base_url, method, path, body, warmup, min(concurrency, warmup))
+            results[name] = await run_scenario(session, base_url, method, path, body, total, concurrency)
+            print_row(name, results[name])
+    return results
+
+
+def print_header():
+    print(f"{'endpoint':<22}{'reqs':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ttfb ms':>10}")
+
+
+def print_row(name, result, baseline=None):
+    row = (
+        f"{name:<22}{result['requests']:>7}{result['errors']:>8}{result['rps']:>10.1f}"
+        f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result.get('ttfb_p50_ms', 0):>10.1f}"
+    )
+    if baseline:
+        row += f"   p95 {result['p95_ms'] - baseline['p95_ms']:+.1f} ms, req/s {result['rps'] - baseline['rps']:+.1f}"
+    print(row)
+
+
+def wait_until_ready(base_url, process, timeout=60):
+    import urllib.request
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The app exited during startup; see its output above.")
+        try:
+            with urllib.request.urlopen(f"{base_url}/openapi.json", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"The app did not start within {timeout} seconds.")
+
+
+def write_fake_token(directory):
+    path = os.path.join(directory, "token.json")
+    with open(path, "w") as token_file:
+        json.dump({
+            "token": "benchmark-token",
+            "refresh_token": "benchmark-refresh-token",
+            "client_id": "benchmark",
+            "client_secret": "benchmark",
+            "token_uri": "http://127.0.0.1:9/token",
+            "expiry": "2099-01-01T00:00:00Z",
+        }, token_file)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per endpoint first")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--app-port", type=int, default=7100)
+    parser.add_argument("--only", action="append", help="Run only this scenario (repeatable)")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Print differences against an earlier --json file")
+    parser.add_argument(
+        "--max-error-rate", type=float, default=0.05,
+        help="Exit with an error when any endpoint fails more than this fraction of requests"
+    )
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    fakes = start_fake_upstreams(0, parse_faults(args))
+    state_dir = tempfile.mkdtemp(prefix="calendar-bench-")
+    env = {
+        **os.environ,
+        **app_environment(fakes.server_port),
+        "GOOGLE_TOKEN_FILE": write_fake_token(state_dir),
+        "CALENDAR_MIRROR_DB": os.path.join(state_dir, "calendar_mirror.db"),
+        "SCHEDULER_DB": os.path.join(state_dir, "scheduler_jobs.sqlite"),
+        "MANGA_WATCHLIST_DB": os.path.join(state_dir, "manga_watchlist.db"),
+        "HISTORY_STORE_DIR": os.path.join(state_dir, "history_store"),
+        "MOVIE_CATALOGUE_DIR": os.path.join(state_dir, "movie_catalogue"),
+    }
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env
+    )
+    try:
+        wait_until_ready(base_url, app)
+        print_header()
+        results = asyncio.run(run_all(base_url, args.only, args.requests, args.concurrency, args.warmup))
+    finally:
+        app.terminate()
+        app.wait(timeout=10)
+        fakes.shutdown()
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print("\nCompared with", args.compare)
+        print_header()
+        for name, result in results.items():
+            print_row(name, result, baseline.get(name))
+
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump(results, results_file, indent=2)
+
+    # Latency of requests that failed says nothing about the endpoint
+    failing = {
+        name: result["errors"] / result["requests"]
+        for name, result in results.items()
+        if result["requests"] and result["errors"] / result["requests"] > args.max_error_rate
+    }
+    if failing:
+        print(f"\nFAILED: error rate above {args.max_error_rate:.0%} for "
+              + ", ".join(f"{name} ({rate:.0%})" for name, rate in failing.items()))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
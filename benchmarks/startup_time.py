@@ -0,0 +1,97 @@
+"""
+Measures how long a fresh interpreter takes to import main.py.
+
+Each run is a new process, so the time is what a new uvicorn worker pays
+before it can serve. The run also fails if any of the heavy SDKs that are
+supposed to load on first use were imported.
+
+    python benchmarks/startup_time.py --runs 10
+    python benchmarks/startup_time.py --budget-ms 1500 --importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported by `import main`
+LAZY_MODULES = [
+    "google.generativeai",
+    "googleapiclient.discovery",
+    "google_auth_oauthlib",
+    "vonage",
+    "win10toast_click",
+    "numpy",
+    "aiohttp",
+    "apscheduler",
+    "sqlalchemy",
+]
+
+CHILD = f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_once(env):
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env, top):
+    """Modules with the highest cumulative import time, from `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, help="Exit with an error when the median is above this")
+    parser.add_argument("--importtime", action="store_true", help="Also list the slowest imports")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # First run compiles bytecode; it is not counted
+    measure_once(env)
+    runs = [measure_once(env) for _ in range(args.runs)]
+    timings = [run["seconds"] * 1000 for run in runs]
+    median = statistics.median(timings)
+    print(f"import main: median {median:.0f} ms, min {min(timings):.0f} ms, max {max(timings):.0f} ms over {args.runs} runs")
+
+    if args.importtime:
+        print("\nSlowest imports (cumulative):")
+        for microseconds, name in slowest_imports(env, args.top):
+            print(f"{microseconds / 1000:>9.1f} ms  {name}")
+
+    failed = False
+    loaded = sorted({module for run in runs for module in run["loaded"]})
+    if loaded:
+        print(f"\nLoaded at import time but should be lazy: {', '.join(loaded)}")
+        failed = True
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"\nMedian {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
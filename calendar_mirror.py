@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from googleapiclient.errors import HttpError
+
+from auth import calendar_client
+
+MIRROR_DB = os.getenv("CALENDAR_MIRROR_DB", os.path.join(os.path.dirname(__file__), 'calendar_mirror.db'))
+# Minimum number of seconds between two delta pulls from Google
+SYNC_INTERVAL = float(os.getenv("CALENDAR_SYNC_INTERVAL", "30"))
+# After a failed pull, the wait before the next attempt doubles up to this many seconds
+SYNC_MAX_BACKOFF = float(os.getenv("CALENDAR_SYNC_MAX_BACKOFF", "300"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    start_utc TEXT,
+    end_utc TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (start_utc);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def to_utc(when: dict):
+    """Normalizes a Google 'start'/'end' object to a sortable UTC string."""
+    if not when:
+        return None
+    if 'dateTime' in when:
+        moment = datetime.fromisoformat(when['dateTime'].replace('Z', '+00:00'))
+        return moment.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    if 'date' in when:
+        return f"{when['date']}T00:00:00Z"
+    return None
+
+
+class CalendarMirror:
+    """
+    Local SQLite copy of the primary calendar.
+
+    The first sync pulls every event; after that only the changes since the
+    stored nextSyncToken are fetched. Writes made through calendar_service are
+    applied here immediately, so reads never have to wait on Google.
+    """
+
+    def __init__(self, path=MIRROR_DB, service_factory=calendar_client.service):
+        self._service_factory = service_factory
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0.0
+        self._next_sync_delay = SYNC_INTERVAL
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def _get_state(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def invalidate(self):
+        """Makes the next read pull the delta from Google instead of waiting for SYNC_INTERVAL."""
+        self._last_sync = 0.0
+        self._next_sync_delay = SYNC_INTERVAL
+
+    def upsert(self, event: dict):
+        if event.get('status') == 'cancelled':
+            self.remove(event['id'])
+            return
+        if event.get('recurrence'):
+            # The mirror stores expanded instances, which only Google can compute
+            self.invalidate()
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO events (id, start_utc, end_utc, body) VALUES (?, ?, ?, ?)",
+                (event['id'], to_utc(event.get('start')), to_utc(event.get('end')), json.dumps(event))
+            )
+
+    def remove(self, event_id: str):
+        with self._lock, self._conn:
+            # Instances of a recurring event have ids of the form "<event_id>_<start>"
+            self._conn.execute("DELETE FROM events WHERE id = ? OR id LIKE ? ESCAPE '\\'", (event_id, f"{event_id}\\_%"))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM events")
+            self._conn.execute("DELETE FROM sync_state WHERE key = 'sync_token'")
+
+    def _pull(self, sync_token):
+        service = self._service_factory()
+        page_token = None
+        while True:
+            params = {'calendarId': 'primary', 'singleEvents': True, 'maxResults': 2500}
+            if sync_token:
+                params['syncToken'] = sync_token
+            if page_token:
+                params['pageToken'] = page_token
+            result = service.events().list(**params).execute()
+
+            for event in result.get('items', []):
+                self.upsert(event)
+
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return result.get('nextSyncToken')
+
+    def sync(self, force: bool = False):
+        """
+        Pulls the changes since the last sync, or everything on the first run.
+
+        Failed attempts are throttled too, with a doubling delay, so reads
+        keep being served locally instead of each waiting on a Google outage.
+        """
+        with self._sync_lock:
+            if not force and time.monotonic() - self._last_sync < self._next_sync_delay:
+                return
+            sync_token = self._get_state('sync_token')
+            try:
+                try:
+                    next_token = self._pull(sync_token)
+                except HttpError as e:
+                    # 410 Gone: the sync token expired, start over with a full sync
+                    if e.resp.status != 410:
+                        raise
+                    print("Calendar sync token expired, running a full sync.")
+                    self.clear()
+                    next_token = self._pull(None)
+            except Exception:
+                self._last_sync = time.monotonic()
+                self._next_sync_delay = min(max(self._next_sync_delay, SYNC_INTERVAL) * 2, SYNC_MAX_BACKOFF)
+                raise
+
+            if next_token:
+                self._set_state('sync_token', next_token)
+            self._last_sync = time.monotonic()
+            self._next_sync_delay = SYNC_INTERVAL
+
+    def _refresh(self):
+        try:
+            self.sync()
+        except Exception as e:
+            # Serve whatever is stored rather than failing the read
+            print(f"Calendar sync failed, serving local events: {e}")
+
+    def upcoming(self, limit: int = 10):
+        self._refresh()
+        now = datetime.now(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body FROM events WHERE end_utc >= ? ORDER BY start_utc LIMIT ?",
+                (now, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def events_between(self, start_utc: str, end_utc: str):
+        """Returns stored events overlapping [start_utc, end_utc); both bounds use the to_utc() format."""
+        self._refresh()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT body FROM events WHERE start_utc < ? AND end_utc > ? ORDER BY start_utc",
+                (end_utc, start_utc)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def get_mirror():
+    global _mirror
+    if _mirror is None:
+        with _mirror_lock:
+            if _mirror is None:
+                _mirror = CalendarMirror()
+    return _mirror
@@ -1,40 +1,156 @@
+import asyncio
 import time
 from fastapi import HTTPException
-from googleapiclient.discovery import build
-from auth import authenticate_google_calendar
-from win10toast_click import ToastNotifier
+from auth import calendar_client
+from calendar_mirror import get_mirror, to_utc
+from free_slots import BusyIndex
+from datetime import datetime
+from datetime import timezone as dt_timezone
 from typing import Optional
 from dotenv import load_dotenv
 
-from notification_service import snooze_notification
-from gemini_service import chat_with_gemini  # Import AI helper
+from notification_dispatcher import notify
 
 load_dotenv()
-toaster = ToastNotifier()
 
 def get_calendar_service():
-    creds = authenticate_google_calendar()
-    return build('calendar', 'v3', credentials=creds)
+    return calendar_client.service()
 
+def _mirror_write(method: str, *args):
+    """
+    Applies a write Google already accepted to the local mirror.
+
+    Never raises: the upstream write succeeded, so a local failure must not
+    turn it into an error (and a duplicate on retry). The mirror re-syncs
+    from Google instead.
+    """
+    try:
+        getattr(get_mirror(), method)(*args)
+    except Exception as e:
+        print(f"Calendar mirror {method} failed, re-syncing on the next read: {e}")
+        try:
+            get_mirror().invalidate()
+        except Exception:
+            pass
+
+def list_upcoming_events(limit: int = 10):
+    # Served from the local mirror; only the delta since the last sync is pulled from Google
+    return get_mirror().upcoming(limit)
+
+def iter_events(
+    time_min: Optional[str] = None,
+    time_max: Optional[str] = None,
+    limit: Optional[int] = None,
+    fields: Optional[str] = None,
+    page_size: int = 250
+):
+    """
+    Lazily yields events from Google Calendar, following nextPageToken.
+
+    Only one page is held in memory at a time, and the next page is requested
+    only once the caller has consumed the current one.
+
+    :param time_min: RFC3339 lower bound on the event end time
+    :param time_max: RFC3339 upper bound on the event start time
+    :param limit: Stop after this many events
+    :param fields: Comma-separated event fields to return, e.g. "id,summary,start"
+    :param page_size: Events requested per page (Google allows up to 2500)
+    """
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+    page_token = None
+    yielded = 0
+    while True:
+        params = {
+            'calendarId': 'primary',
+            'singleEvents': True,
+            'orderBy': 'startTime',
+            'maxResults': page_size if limit is None else min(page_size, limit - yielded),
+        }
+        if time_min:
+            params['timeMin'] = time_min
+        if time_max:
+            params['timeMax'] = time_max
+        if fields:
+            params['fields'] = f"nextPageToken,items({fields})"
+        if page_token:
+            params['pageToken'] = page_token
+
+        # Fetched per page: a streaming response may resume on another worker thread
+        service = get_calendar_service()
+        result = service.events().list(**params).execute()
+
+        for event in result.get('items', []):
+            yield event
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                return
+
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            return
+
+def _parse_utc(value: str):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(dt_timezone.utc)
+
+def get_busy_index(time_min: datetime, time_max: datetime, source: str = 'freebusy'):
+    """
+    Loads the busy time between time_min and time_max into a BusyIndex.
+
+    :param source: 'freebusy' asks Google's freebusy API; 'mirror' uses the
+                   local event mirror and costs no round trip once synced
+    """
+    start_utc = time_min.astimezone(dt_timezone.utc)
+    end_utc = time_max.astimezone(dt_timezone.utc)
+
+    if source == 'mirror':
+        intervals = []
+        for event in get_mirror().events_between(start_utc.strftime('%Y-%m-%dT%H:%M:%SZ'), end_utc.strftime('%Y-%m-%dT%H:%M:%SZ')):
+            # Events marked "free" do not block time
+            if event.get('transparency') == 'transparent':
+                continue
+            intervals.append((_parse_utc(to_utc(event['start'])), _parse_utc(to_utc(event['end']))))
+        return BusyIndex(intervals)
+
+    if source != 'freebusy':
+        raise ValueError("source must be 'freebusy' or 'mirror'")
 
-def list_upcoming_events():
     service = get_calendar_service()
-    events_result = service.events().list(
-        calendarId='primary',
-        maxResults=10,
-        singleEvents=True,
-        orderBy='startTime'
-    ).execute()
-    events = events_result.get('items', [])
-    return events
+    result = service.freebusy().query(body={
+        'timeMin': start_utc.isoformat(),
+        'timeMax': end_utc.isoformat(),
+        'items': [{'id': 'primary'}],
+    }).execute()
+    busy = result.get('calendars', {}).get('primary', {}).get('busy', [])
+    return BusyIndex((_parse_utc(period['start']), _parse_utc(period['end'])) for period in busy)
 
-def create_event(
+# Google rejects batch requests with more than 50 calls.
+BATCH_LIMIT = 50
+
+def recurrence_rules(rule: Optional[str] = None, daily_count: Optional[int] = None):
+    """
+    Builds the 'recurrence' list for an event.
+
+    :param rule: An RFC 5545 rule such as "FREQ=DAILY;COUNT=30"; the RRULE: prefix is optional
+    :param daily_count: Shorthand for a rule repeating every day this many times
+    :return: A list like ["RRULE:FREQ=DAILY;COUNT=30"], or None when neither is given
+    """
+    if daily_count:
+        rule = f"FREQ=DAILY;COUNT={daily_count}"
+    if not rule:
+        return None
+    if not rule.upper().startswith(("RRULE:", "EXRULE:", "RDATE:", "EXDATE:")):
+        rule = f"RRULE:{rule}"
+    return [rule]
+
+def build_event_body(
     summary: str, 
     description: str, 
     start_time: str, 
     end_time: str, 
     reminder_minutes: int, 
-    weather_info=None
+    weather_info=None,
+    recurrence: Optional[list] = None
 ):
     event = {
         'summary': summary,
@@ -65,14 +181,137 @@ def create_event(
         )
         event['description'] += weather_description
 
+    if recurrence:
+        # One stored event covers every occurrence; Google expands the instances
+        event['recurrence'] = recurrence
+
+    return event
+
+def create_event(
+    summary: str, 
+    description: str, 
+    start_time: str, 
+    end_time: str, 
+    reminder_minutes: int, 
+    weather_info=None,
+    recurrence: Optional[list] = None
+):
+    event = build_event_body(summary, description, start_time, end_time, reminder_minutes, weather_info, recurrence)
+
     try:
-        service = authenticate_google_calendar()
-        print("Google Calendar Service:", service)  # Debugging line
+        service = get_calendar_service()
         created_event = service.events().insert(calendarId='primary', body=event).execute()
+        _mirror_write('upsert', created_event)
         return created_event
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
+async def create_event_async(*args, **kwargs):
+    """
+    create_event for async handlers.
+
+    The Google client is blocking, so the insert runs in a worker thread (each
+    with its own service object) while the event loop serves other requests.
+    """
+    return await asyncio.to_thread(create_event, *args, **kwargs)
+
+def _batch_request(service, operation: dict):
+    method = operation.get('method', 'insert')
+    events = service.events()
+
+    if method == 'insert':
+        return events.insert(calendarId='primary', body=operation['event'])
+    if method == 'update':
+        # patch only sends the changed fields, so no extra GET is needed per event
+        return events.patch(calendarId='primary', eventId=operation['event_id'], body=operation['event'])
+    if method == 'delete':
+        return events.delete(calendarId='primary', eventId=operation['event_id'])
+    raise ValueError(f"Unsupported batch method: {method}")
+
+def batch_write_events(operations: list):
+    """
+    Sends many event writes to Google Calendar in as few HTTP round trips as possible.
+
+    Each operation is a dict with a 'method' ('insert', 'update' or 'delete'),
+    an 'event' body for insert/update and an 'event_id' for update/delete.
+
+    Returns one result per operation, in order: {'index', 'ok', 'event'} on
+    success or {'index', 'ok', 'error'} when that single call failed. One
+    failing item never aborts the rest of the batch.
+    """
+    results = [None] * len(operations)
+    service = get_calendar_service()
+
+    def handle_response(request_id, response, exception):
+        index = int(request_id)
+        if exception is not None:
+            results[index] = {'index': index, 'ok': False, 'error': str(exception)}
+            return
+
+        results[index] = {'index': index, 'ok': True, 'event': response or None}
+        if operations[index].get('method') == 'delete':
+            _mirror_write('remove', operations[index]['event_id'])
+        else:
+            _mirror_write('upsert', response)
+
+    for chunk_start in range(0, len(operations), BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=handle_response)
+        for index in range(chunk_start, min(chunk_start + BATCH_LIMIT, len(operations))):
+            try:
+                batch.add(_batch_request(service, operations[index]), request_id=str(index))
+            except (KeyError, ValueError) as e:
+                results[index] = {'index': index, 'ok': False, 'error': f"Invalid operation: {e}"}
+        try:
+            batch.execute()
+        except Exception as e:
+            for index in range(chunk_start, min(chunk_start + BATCH_LIMIT, len(operations))):
+                if results[index] is None:
+                    results[index] = {'index': index, 'ok': False, 'error': f"Batch request failed: {e}"}
+
+    return results
+
+def override_event_instance(
+    event_id: str,
+    original_start: str,
+    summary: Optional[str] = None,
+    description: Optional[str] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    cancel: bool = False
+):
+    """
+    Changes or cancels a single occurrence of a recurring event.
+
+    :param original_start: The occurrence's original start time (RFC3339)
+    :param cancel: Remove just this occurrence instead of changing it
+    """
+    service = get_calendar_service()
+    instances = service.events().instances(
+        calendarId='primary', eventId=event_id, originalStart=original_start
+    ).execute().get('items', [])
+    if not instances:
+        raise HTTPException(status_code=404, detail=f"No occurrence of {event_id} starts at {original_start}")
+    instance = instances[0]
+
+    if cancel:
+        service.events().delete(calendarId='primary', eventId=instance['id']).execute()
+        _mirror_write('remove', instance['id'])
+        return {"message": f"Occurrence {instance['id']} cancelled"}
+
+    changes = {}
+    if summary:
+        changes['summary'] = summary
+    if description:
+        changes['description'] = description
+    if start_time:
+        changes['start'] = {'dateTime': start_time, 'timeZone': 'Europe/Amsterdam'}
+    if end_time:
+        changes['end'] = {'dateTime': end_time, 'timeZone': 'Europe/Amsterdam'}
+
+    updated_instance = service.events().patch(calendarId='primary', eventId=instance['id'], body=changes).execute()
+    _mirror_write('upsert', updated_instance)
+    return {"message": "Occurrence updated", "updated_event": updated_instance}
+
 def update_event(event_id: str, summary: Optional[str] = None, description: Optional[str] = None, start_time: Optional[str] = None, end_time: Optional[str] = None):
     service = get_calendar_service()
     event = service.events().get(calendarId='primary', eventId=event_id).execute()
@@ -87,24 +326,16 @@ def update_event(event_id: str, summary: Optional[str] = None, description: Opti
         event['end'] = {'dateTime': end_time, 'timeZone': 'Europe/Amsterdam'}
 
     updated_event = service.events().update(calendarId='primary', eventId=event_id, body=event).execute()
-    toaster.show_toast(
-        "Event Updated", 
-        f"{event['summary']} on {event['start']['dateTime']}", 
-        duration=5, 
-        callback_on_click=lambda: snooze_notification(event['summary'])
-    )
+    _mirror_write('upsert', updated_event)
+    notify("Event Updated", f"{event['summary']} on {event['start']['dateTime']}", snooze_summary=event['summary'])
     return {"message": "Event updated", "updated_event": updated_event}
 
 def delete_event(event_id: str):
     service = get_calendar_service()
     try:
         service.events().delete(calendarId='primary', eventId=event_id).execute()
-        toaster.show_toast(
-            "Event Deleted", 
-            f"Event ID {event_id} deleted", 
-            duration=5, 
-            callback_on_click=lambda: snooze_notification("Deleted Event")
-        )
+        _mirror_write('remove', event_id)
+        notify("Event Deleted", f"Event ID {event_id} deleted", snooze_summary="Deleted Event")
         return {"message": f"Event with ID {event_id} deleted successfully"}
     except Exception as e:
         return {"error": f"An error occurred: {e}"}
\ No newline at end of file
@@ -0,0 +1,70 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+
+class BusyIndex:
+    """
+    Sorted, non-overlapping busy intervals.
+
+    Overlapping and touching intervals are merged on construction, so both the
+    start and end lists are sorted and a lookup is a single bisect.
+    """
+
+    def __init__(self, intervals):
+        starts, ends = [], []
+        for start, end in sorted(intervals):
+            if end <= start:
+                continue
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self._starts = starts
+        self._ends = ends
+
+    def __len__(self):
+        return len(self._starts)
+
+    def intervals(self):
+        return list(zip(self._starts, self._ends))
+
+    def is_free(self, start: datetime, end: datetime):
+        i = bisect_right(self._ends, start)
+        return i == len(self._starts) or self._starts[i] >= end
+
+    def free_slots(self, window_start: datetime, window_end: datetime, duration: timedelta, count: int = None):
+        """
+        Returns up to `count` back-to-back free (start, end) slots of `duration`
+        between window_start and window_end, earliest first.
+
+        Runs in O(log n + k): one bisect to find the first busy interval that
+        ends after window_start, then a walk over the k gaps it needs.
+        """
+        if duration <= timedelta(0):
+            raise ValueError("duration must be positive")
+        slots = []
+        cursor = window_start
+        i = bisect_right(self._ends, cursor)
+        while cursor + duration <= window_end and (count is None or len(slots) < count):
+            if i < len(self._starts) and self._starts[i] <= cursor:
+                # Inside a busy interval: jump to its end
+                cursor = max(cursor, self._ends[i])
+                i += 1
+                continue
+
+            gap_end = min(self._starts[i], window_end) if i < len(self._starts) else window_end
+            if gap_end - cursor >= duration:
+                slots.append((cursor, cursor + duration))
+                cursor += duration
+            elif i < len(self._starts):
+                cursor = self._ends[i]
+                i += 1
+            else:
+                break
+        return slots
+
+    def next_free(self, after: datetime, duration: timedelta, horizon: timedelta = timedelta(days=14)):
+        """Returns the first free slot of `duration` starting at or after `after`, or None."""
+        slots = self.free_slots(after, after + horizon, duration, count=1)
+        return slots[0] if slots else None
@@ -1,23 +1,171 @@
+import asyncio
+import json
 import os
-import google.generativeai as genai
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cachetools import TTLCache
+
+import metrics
+import singleflight
 
 # Load API Key
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Alternative API endpoint, e.g. a local stand-in for benchmarks
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+# Shared response cache for every AI-backed endpoint
+GEMINI_CACHE_SIZE = int(os.getenv("GEMINI_CACHE_SIZE", "256"))
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "3600"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+
+_response_cache = TTLCache(maxsize=GEMINI_CACHE_SIZE, ttl=GEMINI_CACHE_TTL)
+_cache_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=GEMINI_MAX_CONCURRENCY, thread_name_prefix="gemini")
+cache_stats = {"hits": 0, "misses": 0}
+# Concurrent cache misses for the same prompt share one Gemini call
+_inflight = singleflight.group("gemini")
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def _get_genai():
+    """Imports and configures the Gemini SDK on first use; it is slow to import."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                if GEMINI_API_ENDPOINT:
+                    genai.configure(api_key=GEMINI_API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+                _genai = genai
+    return _genai
+
+
+def _cache_key(prompt: str, model: str, params: dict, variant: int):
+    return (model, prompt, json.dumps(params or {}, sort_keys=True), variant)
+
+
+def _generate(prompt: str, model: str, params: dict = None):
+    """Single instrumented call to the Gemini API."""
+    with metrics.track_upstream("gemini", model):
+        return _get_genai().GenerativeModel(model).generate_content(prompt, generation_config=params)
+
 
 def chat_with_gemini(prompt: str, model="gemini-pro"):
     """
     Calls Google's Gemini AI API and returns a response.
-    
+
     :param prompt: User input message
     :param model: Gemini model to use (default: gemini-pro)
     :return: AI-generated response
     """
     try:
-        response = genai.GenerativeModel(model).generate_content(prompt)
+        response = _generate(prompt, model)
         return response.text.strip()
     except Exception as e:
         return f"Error: {str(e)}"
-    
+
+
+def generate_cached(prompt: str, model="gemini-pro", params: dict = None, variant: int = 0):
+    """
+    Same as chat_with_gemini, but answers repeated prompts from the shared cache.
+
+    :param params: Optional generation_config passed to Gemini; part of the cache key
+    :param variant: Distinguishes several cached answers to the same prompt
+    :return: AI-generated response
+    """
+    key = _cache_key(prompt, model, params, variant)
+    with _cache_lock:
+        cached = _response_cache.get(key)
+        if cached is not None:
+            cache_stats["hits"] += 1
+            return cached
+        cache_stats["misses"] += 1
+
+    def load():
+        text = _generate(prompt, model, params).text.strip()
+        with _cache_lock:
+            _response_cache[key] = text
+        return text
+
+    try:
+        return _inflight.do(key, load)
+    except Exception as e:
+        # Errors are returned but never cached
+        return f"Error: {str(e)}"
+
+
+def stream_gemini(prompt: str, model="gemini-pro", params: dict = None):
+    """
+    Yields Gemini's answer in chunks as they are generated.
+
+    A prompt that is already cached is yielded in one piece. A completed
+    stream is cached like generate_cached would cache it, so either function
+    answers the same prompt from memory afterwards. Errors are raised, not
+    returned as text.
+    """
+    key = _cache_key(prompt, model, params, 0)
+    with _cache_lock:
+        cached = _response_cache.get(key)
+        cache_stats["hits" if cached is not None else "misses"] += 1
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    with metrics.track_upstream("gemini", f"{model}:stream"):
+        response = _get_genai().GenerativeModel(model).generate_content(prompt, generation_config=params, stream=True)
+        for chunk in response:
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+
+    text = "".join(parts).strip()
+    if text:
+        with _cache_lock:
+            _response_cache[key] = text
+
+
+async def generate_cached_async(prompt: str, model="gemini-pro", params: dict = None, variant: int = 0):
+    """
+    generate_cached for async handlers.
+
+    Cache hits are answered on the event loop; only misses go to the shared
+    Gemini pool, so GEMINI_MAX_CONCURRENCY still applies and a cached prompt
+    never queues behind slow Gemini calls.
+    """
+    key = _cache_key(prompt, model, params, variant)
+    with _cache_lock:
+        cached = _response_cache.get(key)
+        if cached is not None:
+            cache_stats["hits"] += 1
+            return cached
+    # generate_cached checks again and counts the miss
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, generate_cached, prompt, model, params, variant)
+
+
+def generate_many(prompt: str, count: int, model="gemini-pro", params: dict = None):
+    """
+    Generates `count` answers to the same prompt in parallel.
+
+    At most GEMINI_MAX_CONCURRENCY calls are in flight at once; each answer is
+    cached as its own variant, so a repeated request is served from memory.
+    """
+    futures = [
+        _executor.submit(generate_cached, prompt, model, params, variant)
+        for variant in range(count)
+    ]
+    return [future.result() for future in futures]
+
+
+def get_cache_stats():
+    with _cache_lock:
+        return {**cache_stats, "size": len(_response_cache)}
+
+
 def parse_natural_language_request(user_input):
     """Use AI to interpret scheduling requests in natural language."""
     prompt = f"""
@@ -29,6 +177,5 @@ def parse_natural_language_request(user_input):
     - Any additional context
     Respond with structured JSON format.
     """
-    model = genai.GenerativeModel("gemini-pro")
-    response = model.generate_content(prompt)
-    return response.text 
\ No newline at end of file
+    response = _generate(prompt, "gemini-pro")
+    return response.text
@@ -1,44 +1,143 @@
-from datetime import datetime
-from random import randint
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+from random import choice
 
-import requests
+import http_client
+import singleflight
 
 from calendar_service import create_event
-from gemini_service import chat_with_gemini
+from gemini_service import generate_cached
 
-def add_historical_event_to_calendar(start_time: str, end_time: str, reminder_minutes: int, random_fact: bool = False, use_ai: bool = False):
+HISTORY_STORE_DIR = os.getenv("HISTORY_STORE_DIR", os.path.join(os.path.dirname(__file__), "history_store"))
+HISTORY_URL = "http://history.muffinlabs.com/date/{month}/{day}"
+
+# Every calendar day, including February 29th
+ALL_DAYS = [(day.month, day.day) for day in (date(2000, 1, 1) + timedelta(days=i) for i in range(366))]
+
+# Concurrent misses for the same day share one fetch and one write
+_inflight = singleflight.group("muffinlabs")
+
+
+def _store_path(month: int, day: int):
+    return os.path.join(HISTORY_STORE_DIR, f"{month:02d}-{day:02d}.json")
+
+
+def stored_days():
+    return [(month, day) for month, day in ALL_DAYS if os.path.exists(_store_path(month, day))]
+
+
+def get_day_history(month: int, day: int):
+    """
+    Returns the muffinlabs data for one calendar day.
+
+    The data for a day never changes, so it is fetched once and kept on disk.
+    Returns None when the day is not stored and the upstream call fails.
+    """
+    path = _store_path(month, day)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as day_file:
+            return json.load(day_file)
+    return _inflight.do((month, day), _fetch_day, month, day)
+
+
+def _fetch_day(month: int, day: int):
+    path = _store_path(month, day)
+    if os.path.exists(path):
+        # Stored by the caller this one was waiting behind
+        with open(path, encoding="utf-8") as day_file:
+            return json.load(day_file)
+
+    try:
+        response = http_client.get(HISTORY_URL.format(month=month, day=day))
+    except Exception as e:
+        print(f"Failed to fetch history for {month}/{day}: {e}")
+        return None
+    if response.status_code != 200:
+        return None
+
+    data = response.json()
+    os.makedirs(HISTORY_STORE_DIR, exist_ok=True)
+    # A temp file of its own, so writers in other processes never truncate it
+    fd, tmp_path = tempfile.mkstemp(dir=HISTORY_STORE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as day_file:
+            json.dump(data, day_file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return data
+
+
+def warm_up_history_store(workers: int = 8):
+    """Fills the store for all 366 days. Returns the number of days stored."""
+    missing = [(month, day) for month, day in ALL_DAYS if not os.path.exists(_store_path(month, day))]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda day: get_day_history(*day), missing))
+    return len(stored_days())
+
+
+def pick_historical_event(random_fact: bool = False):
+    """
+    Picks today's (or a random day's) historical event.
+
+    Returns {'summary', 'description', 'year', 'text'}, or {'message'} when
+    nothing could be found.
+    """
     if random_fact:
-        month = randint(1, 12)
-        day = randint(1, 28)
-        url = f"http://history.muffinlabs.com/date/{month}/{day}"
-        selected_date = f"{month}/{day}"
+        # Any day of the year; stored days are only a fallback when the fetch fails
+        month, day = choice(ALL_DAYS)
     else:
-        today = datetime.now().strftime("%m/%d")
-        url = f"http://history.muffinlabs.com/date/{today}"
-        selected_date = today
-    
-    response = requests.get(url)
-    if response.status_code != 200:
+        today = datetime.now()
+        month, day = today.month, today.day
+    selected_date = f"{month:02d}/{day:02d}"
+
+    data = get_day_history(month, day)
+    stored = stored_days() if data is None and random_fact else []
+    if stored:
+        month, day = choice(stored)
+        selected_date = f"{month:02d}/{day:02d}"
+        data = get_day_history(month, day)
+    if data is None:
         return {"message": "Failed to fetch data from the historical API"}
 
-    data = response.json()
     if not data or "data" not in data or "Events" not in data["data"]:
         return {"message": "No historical events found."}
 
     event_info = data["data"]["Events"][0]
     year = event_info["year"]
     event_text = event_info["text"]
-    
-    summary = f"Historical Event on {selected_date}: {event_text} ({year})"
-    description = f"This event happened on {selected_date} in {year}: {event_text}"
-    
-    if use_ai:
-        ai_prompt = f"""
+
+    return {
+        "summary": f"Historical Event on {selected_date}: {event_text} ({year})",
+        "description": f"This event happened on {selected_date} in {year}: {event_text}",
+        "year": year,
+        "text": event_text,
+    }
+
+
+def historical_ai_prompt(event_text: str, year):
+    return f"""
         Provide a detailed and engaging summary of the historical event: "{event_text}" that occurred in {year}.
         Add interesting context, global impact, and why it still matters today. Make it compelling and insightful.
         """
-        ai_description = chat_with_gemini(ai_prompt)
+
+
+def add_historical_event_to_calendar(start_time: str, end_time: str, reminder_minutes: int, random_fact: bool = False, use_ai: bool = False):
+    fact = pick_historical_event(random_fact)
+    if "message" in fact:
+        return fact
+
+    description = fact["description"]
+    if use_ai:
+        ai_description = generate_cached(historical_ai_prompt(fact["text"], fact["year"]))
         description += f"\n\n💡 AI Insight: {ai_description}"
 
-    event = create_event(summary, description, start_time, end_time, reminder_minutes)
-    return event
\ No newline at end of file
+    event = create_event(fact["summary"], description, start_time, end_time, reminder_minutes)
+    return event
+
+if __name__ == "__main__":
+    print(f"Stored history for {warm_up_history_store()} of {len(ALL_DAYS)} days in {HISTORY_STORE_DIR}")
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+# (connect, read) seconds. The connect timeout is kept just above a TCP
+# retransmission window; the read timeout bounds how long a slow upstream can
+# hold on to one of our worker threads.
+CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "10"))
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Number of distinct hosts that keep a warm pool, and connections per host.
+POOL_HOSTS = int(os.getenv("UPSTREAM_POOL_HOSTS", "16"))
+POOL_SIZE_PER_HOST = int(os.getenv("UPSTREAM_POOL_SIZE", "20"))
+
+# Optional JSON map of upstream host -> replacement base URL, e.g.
+# {"api.themoviedb.org": "http://127.0.0.1:9100/tmdb"}. Used to point every
+# service module at local stand-ins, as the benchmark suite does.
+UPSTREAM_OVERRIDES = json.loads(os.getenv("UPSTREAM_OVERRIDES") or "{}")
+
+# Short upstream names used as metric labels; other hosts are labelled by host
+UPSTREAM_NAMES = {
+    "api.themoviedb.org": "tmdb",
+    "graphql.anilist.co": "anilist",
+    "api.mangadex.org": "mangadex",
+    "zenquotes.io": "zenquotes",
+    "api.api-ninjas.com": "api-ninjas",
+    "history.muffinlabs.com": "muffinlabs",
+    "api.openweathermap.org": "openweathermap",
+    "rest.nexmo.com": "vonage",
+    "127.0.0.1:8000": "spotify",
+}
+
+
+def upstream_name(url: str):
+    host = urlsplit(url).netloc
+    return UPSTREAM_NAMES.get(host, host)
+
+
+def resolve_url(url: str):
+    """Applies UPSTREAM_OVERRIDES to a URL; the path and query are kept."""
+    if not UPSTREAM_OVERRIDES:
+        return url
+    parts = urlsplit(url)
+    base = UPSTREAM_OVERRIDES.get(parts.netloc)
+    if base is None:
+        return url
+    return base.rstrip("/") + url[len(f"{parts.scheme}://{parts.netloc}"):]
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies DEFAULT_TIMEOUT when the caller passes none."""
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = DEFAULT_TIMEOUT
+        return super().send(request, **kwargs)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the process-wide requests session.
+
+    The session keeps one keep-alive connection pool per upstream host, so
+    consecutive calls to the same API reuse a warm TCP+TLS connection.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # Only idempotent calls are retried, and only on connection errors.
+                retries = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2)
+                adapter = TimeoutHTTPAdapter(
+                    pool_connections=POOL_HOSTS,
+                    pool_maxsize=POOL_SIZE_PER_HOST,
+                    max_retries=retries
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def request(method, url, **kwargs):
+    # Labelled by the real upstream, also when it is overridden
+    with metrics.track_upstream(upstream_name(url), method) as call:
+        response = get_session().request(method, resolve_url(url), **kwargs)
+        call.status = response.status_code
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+_async_sessions = {}
+
+
+def get_async_session():
+    """
+    Returns the aiohttp session bound to the running event loop.
+
+    aiohttp sessions cannot be shared between loops, so one is kept per loop.
+    Must be called from inside a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        # Only async callers need aiohttp, so it is imported on first use
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=POOL_HOSTS * POOL_SIZE_PER_HOST,
+            limit_per_host=POOL_SIZE_PER_HOST,
+            keepalive_timeout=30
+        )
+        timeout = aiohttp.ClientTimeout(sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+        session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        _async_sessions[loop] = session
+    return session
+
+
+async def fetch_json(method, url, **kwargs):
+    """
+    Async counterpart of get/post that returns (status_code, parsed JSON body).
+
+    The body is None when the upstream did not answer with JSON.
+    """
+    session = get_async_session()
+    with metrics.track_upstream(upstream_name(url), method) as call:
+        async with session.request(method, resolve_url(url), **kwargs) as response:
+            call.status = response.status
+            try:
+                data = await response.json(content_type=None)
+            except ValueError:
+                data = None
+            return response.status, data
+
+
+async def close_async_sessions():
+    """Closes every aiohttp session; call on application shutdown."""
+    while _async_sessions:
+        _, session = _async_sessions.popitem()
+        await session.close()
+
+
+def close():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
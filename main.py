@@ -1,33 +1,184 @@
 from datetime import datetime, timedelta
 import logging
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from typing import Optional
-from anime_service import get_next_airing_episode
+import json
+import time
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Match
+from typing import List, Literal, Optional
+from pydantic import BaseModel
+from anime_service import get_next_airing_episode, get_next_airing_episodes
 from calendar_service import (
     list_upcoming_events, 
+    iter_events,
+    get_busy_index,
+    recurrence_rules,
+    override_event_instance,
+    build_event_body,
+    batch_write_events,
     create_event,
+    create_event_async,
     update_event, 
     delete_event
 )
-from auth import authenticate_google_calendar
+from auth import authenticate_google_calendar, calendar_client
 from pytz import timezone
 from helpers import Utils
-from historical_service import add_historical_event_to_calendar
+from utils import Utils as EventUtils
+from historical_service import add_historical_event_to_calendar, historical_ai_prompt, pick_historical_event
 from manga_service import get_latest_manga_chapter, open_chapter, search_manga
-from mindfulness_service import get_mindfulness_quote
-from motivational_service import get_motivational_quote
-from movie_service import fetch_movie_recommendation, recommend_movie_with_ai
+from mindfulness_service import get_mindfulness_quote_async
+from motivational_service import get_motivational_quote_async
+from movie_service import (
+    fetch_movie_recommendation,
+    get_catalogue_refresh_status,
+    movie_ai_prompt,
+    recommend_movie_with_ai,
+    run_catalogue_refresh,
+    start_catalogue_refresh
+)
 # from notification_service import send_sms_notification
-from spotify_service import notify_spotify_playback
-from weather_service import fetch_weather
-from gemini_service import chat_with_gemini
+from spotify_service import schedule_playback_cues, schedule_playback_cues_async
+from weather_service import fetch_weather_async
+from gemini_service import generate_cached_async, generate_many, get_cache_stats, stream_gemini
+import http_client
+import scheduler_service
+import manga_watchlist
+import metrics
+import notification_dispatcher
+import profiling
+import singleflight
+import sms_queue
 
 app = FastAPI()
+app.router.route_class = profiling.ProfiledRoute
+
+metrics.register_stats("calendar_client_stats", "Credential loads, token refreshes and service builds.", lambda: calendar_client.stats)
+metrics.register_stats("gemini_cache_stats", "Gemini response cache hits, misses and size.", get_cache_stats)
+metrics.register_stats("notification_stats", "Notifications queued, delivered, failed and dropped.", notification_dispatcher.get_stats)
+metrics.register_stats("sms_queue_stats", "SMS digests queued, sent, coalesced, retried and failed.", sms_queue.get_stats)
+
+def _route_template(request: Request):
+    # Label by route template, so /events/{event_id} is one series
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def record_route_metrics(request: Request, call_next):
+    labels = {"method": request.method, "route": _route_template(request)}
+    metrics.route_in_flight.inc(**labels)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.route_duration.observe(time.perf_counter() - started, **labels)
+        metrics.route_requests.inc(status=status, **labels)
+        metrics.route_in_flight.dec(**labels)
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    if not profiling.wants_profile(request.headers, request.query_params):
+        return await call_next(request)
+    profile, token = profiling.start_profile(request.method, request.url.path)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Profile-Id"] = profile.id
+        return response
+    finally:
+        profiling.finish_profile(profile, token, time.perf_counter() - started, status)
+
+@app.on_event("startup")
+def start_scheduler():
+    # Started eagerly so jobs persisted before a restart fire on time
+    scheduler_service.get_scheduler()
+    manga_watchlist.schedule_polling()
+
+@app.on_event("shutdown")
+async def close_upstream_clients():
+    http_client.close()
+    await http_client.close_async_sessions()
+    scheduler_service.shutdown()
+    notification_dispatcher.close()
+    sms_queue.close()
+
+class PlaybackCue(BaseModel):
+    track_uri: str
+    play_time: str
+
+class BatchEventOperation(BaseModel):
+    method: Literal["insert", "update", "delete"] = "insert"
+    event_id: Optional[str] = None
+    summary: Optional[str] = None
+    description: Optional[str] = None
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    reminder_minutes: int = 10
+
+    def to_operation(self):
+        if self.method == "insert":
+            event = build_event_body(self.summary, self.description, self.start_time, self.end_time, self.reminder_minutes)
+            return {"method": "insert", "event": event}
+        if self.method == "update":
+            event = {}
+            if self.summary:
+                event["summary"] = self.summary
+            if self.description:
+                event["description"] = self.description
+            if self.start_time:
+                event["start"] = {"dateTime": self.start_time, "timeZone": "Europe/Amsterdam"}
+            if self.end_time:
+                event["end"] = {"dateTime": self.end_time, "timeZone": "Europe/Amsterdam"}
+            return {"method": "update", "event_id": self.event_id, "event": event}
+        return {"method": "delete", "event_id": self.event_id}
+
+def _sse(event: str, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _sse_response(events):
+    # X-Accel-Buffering stops proxies such as nginx from holding tokens back
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _stream_tokens(prompt: str, parts: list):
+    """Yields one SSE `token` event per Gemini chunk and collects the chunks in `parts`."""
+    for text in stream_gemini(prompt):
+        parts.append(text)
+        yield _sse("token", {"text": text})
 
 @app.get("/events", summary="List Upcoming Events", tags=["Calendar"])
-def get_upcoming_events():
+def get_upcoming_events(
+    stream: bool = False,
+    time_min: Optional[str] = None,
+    time_max: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = None
+):
+    """
+    List events. Without filters this returns the next 10 upcoming events.
+
+    With stream=true the events are sent as newline-delimited JSON while the
+    pages are fetched from Google, so exports of any size run in constant memory.
+    """
+    if stream:
+        def ndjson():
+            for event in iter_events(time_min, time_max, limit, fields):
+                yield json.dumps(event) + "\n"
 
-    events = list_upcoming_events()
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    if time_min or time_max or fields:
+        events = list(iter_events(time_min, time_max, limit or 10, fields))
+    else:
+        events = list_upcoming_events(limit or 10)
     if not events:
         return {"message": "No upcoming events found"}
     return events
@@ -38,11 +189,36 @@ def schedule_event(
     description: Optional[str] = None,
     start_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%M:%S%z'),
     end_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=90)).strftime('%Y-%m-%dT%H:%M:%S%z'),
-    reminder_minutes: int = 10
+    reminder_minutes: int = 10,
+    repeat_daily_for: Optional[int] = None,
+    recurrence_rule: Optional[str] = None
 ):
-    event = create_event(summary, description, start_time, end_time, reminder_minutes)
+    event = create_event(summary, description, start_time, end_time, reminder_minutes,
+                         recurrence=recurrence_rules(recurrence_rule, repeat_daily_for))
     return {"message": "Event created", "event": event}
 
+@app.post("/events/batch", summary="Batch Create, Update and Delete Events", tags=["Calendar"])
+def batch_events(operations: List[BatchEventOperation]):
+    """
+    Apply many event writes in one Google batch request.
+
+    Every operation gets its own result, so a single bad item is reported
+    without failing the others.
+    """
+    for operation in operations:
+        if operation.method == "insert" and not (operation.summary and operation.start_time and operation.end_time):
+            raise HTTPException(status_code=400, detail="Insert operations need summary, start_time and end_time.")
+        if operation.method != "insert" and not operation.event_id:
+            raise HTTPException(status_code=400, detail=f"{operation.method.capitalize()} operations need an event_id.")
+
+    results = batch_write_events([operation.to_operation() for operation in operations])
+    failed = [result for result in results if not result["ok"]]
+    return {
+        "message": f"{len(results) - len(failed)} of {len(results)} operations succeeded.",
+        "results": results,
+        "failed": len(failed)
+    }
+
 @app.get("/recommendations", summary="AI-Driven Personalized Recommendations", tags=["Recommendations"])
 def get_recommendations(
     user_id: Optional[str] = None, 
@@ -56,13 +232,13 @@ def get_recommendations(
         historical_events = list_upcoming_events()
 
         # Generate Event Suggestions
-        suggested_events = Utils.generate_event_suggestions(historical_events, num_suggestions)
+        suggested_events = EventUtils.generate_event_suggestions(historical_events, num_suggestions)
 
         # Recommend Spotify Playlists
-        spotify_playlists = Utils.recommend_spotify_playlists(historical_events, num_suggestions)
+        spotify_playlists = EventUtils.recommend_spotify_playlists(historical_events, num_suggestions)
 
         # Recommend YouTube Videos
-        youtube_videos = Utils.recommend_youtube_videos(historical_events, num_suggestions)
+        youtube_videos = EventUtils.recommend_youtube_videos(historical_events, num_suggestions)
 
         return {
             "message": "Personalized recommendations generated successfully.",
@@ -74,13 +250,60 @@ def get_recommendations(
         logging.error(f"Failed to generate recommendations: {e}")
         raise HTTPException(status_code=500, detail="Error generating recommendations.")
     
+@app.post("/spotify/cues", summary="Schedule Many Spotify Playback Cues", tags=["Spotify"])
+async def schedule_spotify_cues(cues: List[PlaybackCue]):
+    """
+    Schedule any number of playlist cues with one request to the playlist
+    scheduler. Cues for the same playlist and minute are sent once.
+    """
+    scheduled = await schedule_playback_cues_async([(cue.track_uri, cue.play_time) for cue in cues])
+    return {"message": f"{scheduled} Spotify playback cues scheduled.", "scheduled": scheduled}
+
+# Upper bound on `count` for /free-slots
+MAX_FREE_SLOTS = 100
+
+@app.get("/free-slots", summary="Find Free Time Slots", tags=["Calendar"])
+def find_free_slots(
+    duration_minutes: int = Query(30, gt=0),
+    count: int = Query(5, ge=1, le=MAX_FREE_SLOTS),
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    source: str = "freebusy"
+):
+    """
+    Find the first `count` free slots of `duration_minutes` between start_time
+    (default now) and end_time (default a week later).
+
+    source=freebusy asks Google for busy time; source=mirror uses the local
+    event mirror.
+    """
+    try:
+        window_start = datetime.strptime(start_time, "%Y-%m-%dT%H:%M:%S%z") if start_time else datetime.now(timezone('Europe/Amsterdam'))
+        window_end = datetime.strptime(end_time, "%Y-%m-%dT%H:%M:%S%z") if end_time else window_start + timedelta(days=7)
+        busy = get_busy_index(window_start, window_end, source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    slots = busy.free_slots(window_start, window_end, timedelta(minutes=duration_minutes), count)
+    local = timezone('Europe/Amsterdam')
+    return {
+        "slots": [
+            {"start": start.astimezone(local).isoformat(), "end": end.astimezone(local).isoformat()}
+            for start, end in slots
+        ]
+    }
+
 @app.post("/schedule-focus-blocks", summary="Schedule Focus Blocks with AI Coaching", tags=["Productivity", "Calendar"])
 def schedule_focus_blocks(
-    num_blocks: int = 3, 
-    focus_duration: int = 90, 
-    break_duration: int = 10,
+    response: Response,
+    num_blocks: int = Query(3, ge=1),
+    focus_duration: int = Query(90, gt=0),
+    break_duration: int = Query(10, ge=0),
     start_time: Optional[str] = None,
-    summary_prefix: str = "Focus Block"
+    summary_prefix: str = "Focus Block",
+    pack_around_meetings: bool = False,
+    repeat_daily_for: Optional[int] = None,
+    recurrence_rule: Optional[str] = None
 ):
     """
     Schedule 90-minute focus blocks followed by 10-minute breaks.
@@ -93,6 +316,9 @@ def schedule_focus_blocks(
         - break_duration: Duration of each break (in minutes).
         - start_time: Optional start time (default is now).
         - summary_prefix: Title prefix for focus events.
+        - pack_around_meetings: Move each block (and its break) to the next free slot instead of double-booking.
+        - repeat_daily_for: Repeat the whole schedule daily for this many days, as recurring events.
+        - recurrence_rule: Any other RRULE (e.g. "FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=12") to repeat the schedule.
     """
     try:
         # Default start time to now if not provided
@@ -100,45 +326,74 @@ def schedule_focus_blocks(
             start_time, "%Y-%m-%dT%H:%M:%S%z"
         )
 
-        events = []
-        ai_coaching_tips = []
-
-        for i in range(num_blocks):
-            # Generate AI productivity advice for this focus session
-            ai_tip = chat_with_gemini(
-                f"I'm about to enter a {focus_duration}-minute deep work session, and I want to operate at peak efficiency. " 
-                    "Provide a highly effective productivity strategy that elite performers, world-class thinkers, "
-                    "and top entrepreneurs use to maximize focus, mental clarity, and execution. "
-                    "I dont want generic tips—I need something that will elevate my output to an elite level. "
-                    "Consider techniques from neuroscience, flow state optimization, high-performance habits, and time management mastery. "
-                    "Give me one precise, actionable strategy, backed by science or expert insights, "
-                    "that I can implement immediately to supercharge my focus and results."
-            )
-            
-            ai_coaching_tips.append(ai_tip)
+        operations = []
+        recurrence = recurrence_rules(recurrence_rule, repeat_daily_for)
+
+        busy = None
+        if pack_around_meetings:
+            block_length = timedelta(minutes=focus_duration + break_duration)
+            busy = get_busy_index(current_time, current_time + timedelta(days=14))
+
+        # Generate AI productivity advice for every focus session in parallel
+        ai_coaching_tips = generate_many(
+            f"I'm about to enter a {focus_duration}-minute deep work session, and I want to operate at peak efficiency. " 
+                "Provide a highly effective productivity strategy that elite performers, world-class thinkers, "
+                "and top entrepreneurs use to maximize focus, mental clarity, and execution. "
+                "I dont want generic tips—I need something that will elevate my output to an elite level. "
+                "Consider techniques from neuroscience, flow state optimization, high-performance habits, and time management mastery. "
+                "Give me one precise, actionable strategy, backed by science or expert insights, "
+                "that I can implement immediately to supercharge my focus and results.",
+            num_blocks
+        )
 
+        for i, ai_tip in enumerate(ai_coaching_tips):
             # Schedule Focus Block
+            if busy is not None:
+                slot = busy.next_free(current_time, block_length)
+                if slot is None:
+                    raise ValueError("No free time left for the remaining focus blocks.")
+                current_time = slot[0]
             focus_start = current_time
             focus_end = focus_start + timedelta(minutes=focus_duration)
             focus_summary = f"{summary_prefix} {i+1}"
-            focus_event = create_event(focus_summary, ai_tip, focus_start.isoformat(), focus_end.isoformat(), 10)
-            events.append(focus_event)
+            focus_event = build_event_body(focus_summary, ai_tip, focus_start.isoformat(), focus_end.isoformat(), 10, recurrence=recurrence)
+            operations.append({"method": "insert", "event": focus_event})
 
             # Schedule Break
             break_start = focus_end
             break_end = break_start + timedelta(minutes=break_duration)
             break_summary = f"Break {i+1}"
-            break_event = create_event(break_summary, "Take a short break", break_start.isoformat(), break_end.isoformat(), 5)
-            events.append(break_event)
+            break_event = build_event_body(break_summary, "Take a short break", break_start.isoformat(), break_end.isoformat(), 5, recurrence=recurrence)
+            operations.append({"method": "insert", "event": break_event})
 
             # Update current time to after the break
             current_time = break_end
 
+        # All blocks and breaks go to Google in a single batch round trip
+        results = batch_write_events(operations)
+        events = [result["event"] for result in results if result["ok"]]
+        failed = [result for result in results if not result["ok"]]
+        # Operations alternate focus block, break; count the focus blocks that were created
+        blocks_created = sum(1 for result in results[0::2] if result["ok"])
+        if failed:
+            logging.error(f"{len(failed)} focus block events failed: {failed}")
+        if not events:
+            raise HTTPException(status_code=502, detail={"message": "No focus blocks could be scheduled.", "failed": failed})
+        if failed:
+            # Multi-Status: some events were created, some were not
+            response.status_code = 207
+            message = f"{blocks_created} of {num_blocks} focus blocks scheduled with AI coaching; {len(failed)} events failed."
+        else:
+            message = f"{num_blocks} focus blocks scheduled successfully with AI coaching."
+
         return {
-            "message": f"{num_blocks} focus blocks scheduled successfully with AI coaching.",
+            "message": message,
             "events": events,
+            "failed": failed,
             "ai_coaching_tips": ai_coaching_tips  # Include AI-generated deep work tips
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error scheduling focus blocks: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to schedule focus blocks.")
@@ -155,6 +410,22 @@ def modify_event(
     updated_event = update_event(event_id, summary, description, start_time, end_time)
     return {"message": "Event updated", "updated_event": updated_event}
 
+@app.put("/events/{event_id}/instances", summary="Change or Cancel One Occurrence", tags=["Calendar"])
+def modify_event_instance(
+    event_id: str,
+    original_start: str,
+    summary: Optional[str] = None,
+    description: Optional[str] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
+    cancel: bool = False
+):
+    """
+    Override a single occurrence of a recurring event, identified by its
+    original start time, or cancel it with cancel=true.
+    """
+    return override_event_instance(event_id, original_start, summary, description, start_time, end_time, cancel)
+
 @app.delete("/delete-event/{event_id}", summary="Delete Event", tags=["Calendar"])
 def remove_event(event_id: str):
     result = delete_event(event_id)
@@ -174,7 +445,9 @@ def add_historical_event(
         
         if reminder_track_uri:
             print("Calling notify_spotify_playback for reminder with track_uri:", reminder_track_uri)
-            notify_spotify_playback(track_uri=reminder_track_uri, play_before=reminder_minutes)
+            start_dt = datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S%z')
+            reminder_time = (start_dt - timedelta(minutes=reminder_minutes)).strftime('%Y-%m-%dT%H:%M:%S%z')
+            schedule_playback_cues([(reminder_track_uri, reminder_time)])
 
         if "message" in event:
             return {"message": event["message"]}
@@ -187,9 +460,45 @@ def add_historical_event(
         print("Error adding historical event:", str(e))  # Log the error
         raise HTTPException(status_code=500, detail="Failed to add historical event.")
 
+@app.post("/add-historical-event/stream", summary="Add Historical Event (Streaming AI)", tags=["Calendar"])
+def add_historical_event_stream(
+    start_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%M:%S%z'),
+    end_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=90)).strftime('%Y-%m-%dT%H:%M:%S%z'),
+    reminder_minutes: int = 10,
+    random_fact: bool = False,
+    reminder_track_uri: Optional[str] = None
+):
+    """
+    Server-sent events: a `token` event per chunk of the AI insight as Gemini
+    writes it, then an `event` message with the created calendar event, or an
+    `error` message.
+    """
+    def events():
+        try:
+            fact = pick_historical_event(random_fact)
+            if "message" in fact:
+                yield _sse("error", {"detail": fact["message"]})
+                return
+
+            parts = []
+            yield from _stream_tokens(historical_ai_prompt(fact["text"], fact["year"]), parts)
+            description = f"{fact['description']}\n\n💡 AI Insight: {''.join(parts).strip()}"
+            event = create_event(fact["summary"], description, start_time, end_time, reminder_minutes)
+
+            if reminder_track_uri:
+                start_dt = datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S%z')
+                reminder_time = (start_dt - timedelta(minutes=reminder_minutes)).strftime('%Y-%m-%dT%H:%M:%S%z')
+                schedule_playback_cues([(reminder_track_uri, reminder_time)])
+
+            yield _sse("event", {"message": "Historical event added.", "event": event})
+        except Exception as e:
+            print("Error adding historical event:", str(e))
+            yield _sse("error", {"detail": "Failed to add historical event."})
+
+    return _sse_response(events())
+
 @app.post("/add-mangadex-chapter", summary="Add MangaDex Chapter Event", tags=["Manga"])
 def add_mangadex_chapter(
-    background_tasks: BackgroundTasks,
     manga_title: str,
     start_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%M:%S%z'),
     end_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=60)).strftime('%Y-%m-%dT%H:%M:%S%z'),
@@ -208,8 +517,6 @@ def add_mangadex_chapter(
     if chapter_url:
         summary = f"Reading Chapter of {manga_title}"
         description = f"Read the chapter here: {chapter_url}"
-        print(f"Scheduling to open chapter URL at {start_time_dt}")
-        background_tasks.add_task(open_chapter, chapter_url, start_time_dt)
     else:
         manga_info = search_manga(manga_title)
         if "message" in manga_info:
@@ -222,29 +529,101 @@ def add_mangadex_chapter(
         summary = f"New Chapter of {manga_info['title']} Available!"
         chapter_url = chapter_info['chapter_url']
         description = f"Read the latest chapter here: {chapter_url}"
-        print(f"Scheduling to open latest chapter URL at {start_time_dt}")
-        background_tasks.add_task(open_chapter, chapter_url, start_time_dt)
 
     # Create Google Calendar Event
     event = create_event(summary, description, start_time, end_time, reminder_minutes)
     print(f"Google Calendar Event Created: {event}")
 
+    # Only once the event exists: the job is persisted and would otherwise outlive a failed insert
+    print(f"Scheduling to open chapter URL at {start_time_dt}")
+    open_chapter(chapter_url, start_time_dt)
+
     return {
         "message": "Manga chapter event scheduled successfully.",
         "event": event,
         "chapter_url": chapter_url
     }
 
+@app.post("/manga-watchlist", summary="Follow a Manga", tags=["Manga"])
+def follow_manga(manga_title: Optional[str] = None, manga_id: Optional[str] = None):
+    if not manga_id:
+        if not manga_title:
+            raise HTTPException(status_code=400, detail="Provide a manga_title or manga_id.")
+        manga_info = search_manga(manga_title)
+        if "message" in manga_info:
+            return {"message": manga_info["message"]}
+        manga_id, manga_title = manga_info["id"], manga_info["title"]
+
+    entry = manga_watchlist.add_to_watchlist(manga_id, manga_title or manga_id)
+    return {"message": "Manga added to watchlist.", "manga": entry}
+
+@app.get("/manga-watchlist", summary="List Followed Manga", tags=["Manga"])
+def list_followed_manga():
+    return manga_watchlist.get_watchlist()
+
+@app.delete("/manga-watchlist/{manga_id}", summary="Unfollow a Manga", tags=["Manga"])
+def unfollow_manga(manga_id: str):
+    manga_watchlist.remove_from_watchlist(manga_id)
+    return {"message": f"Manga {manga_id} removed from watchlist."}
+
+@app.post("/manga-watchlist/poll", summary="Check Followed Manga for New Chapters", tags=["Manga"])
+def poll_manga_watchlist():
+    new_chapters = manga_watchlist.poll_watchlist()
+    return {"message": f"{len(new_chapters)} new chapters found.", "new_chapters": new_chapters}
+
+@app.get("/scheduled-jobs", summary="List Scheduled Jobs", tags=["Scheduler"])
+def get_scheduled_jobs():
+    return scheduler_service.list_jobs()
+
 @app.get("/authenticate", summary="Authenticate Google Calendar", tags=["Auth"])
 def google_calendar_authenticate():
     creds = authenticate_google_calendar()
     if creds:
+        calendar_client.reset()
         return {"message": "Authentication successful, token.json created"}
     else:
         raise HTTPException(status_code=401, detail="Authentication failed")
 
+@app.get("/gemini/cache-stats", summary="Gemini Response Cache Statistics", tags=["AI"])
+def gemini_cache_stats():
+    return get_cache_stats()
+
+@app.get("/singleflight/stats", summary="Coalesced Upstream Call Statistics", tags=["Monitoring"])
+def singleflight_stats():
+    """Per upstream: calls that went out (leader) and identical concurrent calls that were merged into them (shared)."""
+    return singleflight.get_stats()
+
+@app.get("/metrics", summary="Prometheus Metrics", tags=["Monitoring"], response_class=PlainTextResponse)
+def get_metrics():
+    """Latency histograms, status counts and in-flight gauges for every route and upstream API."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def _check_profiles_access(request: Request):
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled.")
+    if not profiling.can_read_profiles(request.headers, request.query_params):
+        raise HTTPException(status_code=403, detail="Send PROFILING_TOKEN in X-Profile or ?profile= to read profiles.")
+
+@app.get("/debug/profiles", summary="Slowest Profiled Requests", tags=["Monitoring"])
+def list_profiles(request: Request):
+    _check_profiles_access(request)
+    return profiling.slowest_profiles()
+
+@app.get("/debug/profiles/{profile_id}", summary="Download a Request Profile", tags=["Monitoring"], response_class=PlainTextResponse)
+def download_profile(profile_id: str, request: Request):
+    """Collapsed stacks, ready for flamegraph.pl or speedscope."""
+    _check_profiles_access(request)
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return PlainTextResponse(profile.collapsed())
+
+@app.get("/calendar-client/stats", summary="Calendar Client Statistics", tags=["Auth"])
+def calendar_client_stats():
+    return calendar_client.stats
+
 @app.post("/schedule-mindfulness-event", summary="Schedule Mindfulness Event", tags=["Mindfulness", "Calendar"])
-def schedule_mindfulness_event(
+async def schedule_mindfulness_event(
     summary: str = "Mindfulness Reminder", 
     description: Optional[str] = None, 
     start_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%M:%S%z'), 
@@ -253,29 +632,36 @@ def schedule_mindfulness_event(
     pre_event_track_uri: Optional[str] = None,
     during_event_track_uri: Optional[str] = None,
     post_event_offset: int = 10,
-    post_event_track_uri: Optional[str] = None
+    post_event_track_uri: Optional[str] = None,
+    repeat_daily_for: Optional[int] = None,
+    recurrence_rule: Optional[str] = None
 ):
+    """
+    The quote fetch and calendar insert run in sequence (the description needs
+    the quote). The Spotify cues go out in one batched request, only once the
+    event exists, since a sent cue cannot be taken back.
+    """
     try:
-        quote = get_mindfulness_quote()
-        
-        if not description:
-            description = f"Mindfulness Quote of the Day: {quote}"
-        
-        event = create_event(summary, description, start_time, end_time, pre_event_offset)
-        
         start_dt = datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S%z')
-        
+        cues = []
+
         if pre_event_track_uri:
             pre_event_time = (start_dt - timedelta(minutes=pre_event_offset)).strftime('%Y-%m-%dT%H:%M:%S%z')
-            notify_spotify_playback(track_uri=pre_event_track_uri, play_time=pre_event_time)
+            cues.append((pre_event_track_uri, pre_event_time))
 
         if during_event_track_uri:
             during_event_time = start_dt.strftime('%Y-%m-%dT%H:%M:%S%z')
-            notify_spotify_playback(track_uri=during_event_track_uri, play_time=during_event_time)
+            cues.append((during_event_track_uri, during_event_time))
 
         if post_event_track_uri:
             post_event_time = (start_dt + timedelta(minutes=post_event_offset)).strftime('%Y-%m-%dT%H:%M:%S%z')
-            notify_spotify_playback(track_uri=post_event_track_uri, play_time=post_event_time)
+            cues.append((post_event_track_uri, post_event_time))
+
+        quote = await get_mindfulness_quote_async()
+        event = await create_event_async(summary, description or f"Mindfulness Quote of the Day: {quote}",
+                                         start_time, end_time, pre_event_offset,
+                                         recurrence=recurrence_rules(recurrence_rule, repeat_daily_for))
+        await schedule_playback_cues_async(cues)
 
         return {
             "message": "Mindfulness event created, and individual Spotify playlists scheduled based on specified times.",
@@ -285,40 +671,44 @@ def schedule_mindfulness_event(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+MOTIVATIONAL_AI_PROMPT = (
+    "I'm about to start a high-energy motivational session and need a truly powerful quote from a legendary athlete. "
+    "The quote should ignite passion, resilience, and relentless pursuit of greatness—something that pushes me beyond limits" 
+    "and fuels my determination. Share a quote from a world-class athlete known for their mental toughness, "
+    "discipline, and drive to win, along with their name and a brief context about why it's impactful."
+)
+
 @app.post("/schedule-motivational-event", summary="Schedule Motivational Event", tags=["Motivation", "Calendar"])
-def schedule_motivational_event(
+async def schedule_motivational_event(
     summary: str = "Motivational Reminder", 
     description: Optional[str] = None, 
     start_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%M:%S%z'), 
     end_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=90)).strftime('%Y-%m-%dT%H:%M:%S%z'), 
     reminder_minutes: int = 10,
     track_uri: Optional[str] = None,
-    use_ai: bool = False
+    use_ai: bool = False,
+    repeat_daily_for: Optional[int] = None,
+    recurrence_rule: Optional[str] = None
 ):
     print("Inside schedule_motivational_event")
     print("track_uri:", track_uri)  
     try:
         if use_ai:
-            quote = chat_with_gemini(
-                f"I'm about to start a high-energy motivational session and need a truly powerful quote from a legendary athlete. "
-                "The quote should ignite passion, resilience, and relentless pursuit of greatness—something that pushes me beyond limits" 
-                "and fuels my determination. Share a quote from a world-class athlete known for their mental toughness, "
-                "discipline, and drive to win, along with their name and a brief context about why it's impactful."
-            )
+            quote = await generate_cached_async(MOTIVATIONAL_AI_PROMPT)
             print("Gemini AI quote:", quote)
         else:
-            quote = get_motivational_quote()
-        
-        if not description:
-            description = f"Motivational Quote of the Day: {quote}"
-        
-        event = create_event(summary, description, start_time, end_time, reminder_minutes)
-        
+            quote = await get_motivational_quote_async()
+
+        event = await create_event_async(summary, description or f"Motivational Quote of the Day: {quote}",
+                                         start_time, end_time, reminder_minutes,
+                                         recurrence=recurrence_rules(recurrence_rule, repeat_daily_for))
+
+        # After the insert: a cue for an event that was never created cannot be recalled
         if track_uri:
             start_dt = datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S%z')
             reminder_time = (start_dt - timedelta(minutes=reminder_minutes)).strftime('%Y-%m-%dT%H:%M:%S%z')
             print("Calling notify_spotify_playback with track_uri:", track_uri)
-            notify_spotify_playback(track_uri=track_uri, play_time=reminder_time)
+            await schedule_playback_cues_async([(track_uri, reminder_time)])
         
         return {
             "message": "Motivational event created, and Spotify playback scheduled (if track URI provided).",
@@ -329,6 +719,48 @@ def schedule_motivational_event(
         print("Exception in schedule_motivational_event:", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/schedule-motivational-event/stream", summary="Schedule Motivational Event (Streaming AI)", tags=["Motivation", "Calendar"])
+def schedule_motivational_event_stream(
+    summary: str = "Motivational Reminder", 
+    description: Optional[str] = None, 
+    start_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%M:%S%z'), 
+    end_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=90)).strftime('%Y-%m-%dT%H:%M:%S%z'), 
+    reminder_minutes: int = 10,
+    track_uri: Optional[str] = None,
+    repeat_daily_for: Optional[int] = None,
+    recurrence_rule: Optional[str] = None
+):
+    """
+    Server-sent events: a `token` event per chunk of the AI quote as Gemini
+    writes it, then an `event` message with the created calendar event, or an
+    `error` message.
+    """
+    def events():
+        try:
+            parts = []
+            yield from _stream_tokens(MOTIVATIONAL_AI_PROMPT, parts)
+            quote = "".join(parts).strip()
+
+            event = create_event(summary, description or f"Motivational Quote of the Day: {quote}",
+                                 start_time, end_time, reminder_minutes,
+                                 recurrence=recurrence_rules(recurrence_rule, repeat_daily_for))
+
+            if track_uri:
+                start_dt = datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S%z')
+                reminder_time = (start_dt - timedelta(minutes=reminder_minutes)).strftime('%Y-%m-%dT%H:%M:%S%z')
+                schedule_playback_cues([(track_uri, reminder_time)])
+
+            yield _sse("event", {
+                "message": "Motivational event created, and Spotify playback scheduled (if track URI provided).",
+                "event": event,
+                "quote": quote
+            })
+        except Exception as e:
+            print("Exception in schedule_motivational_event_stream:", e)
+            yield _sse("error", {"detail": str(e)})
+
+    return _sse_response(events())
+
 @app.post("/add-anime-episode", summary="Add Anime Episode Event", tags=["Anime"])
 def add_anime_episode(
     anime_title: str, 
@@ -342,7 +774,7 @@ def add_anime_episode(
         if "message" in anime_info:
             return {"message": anime_info["message"]}
         
-        airing_date = Utils.convert_timestamp_to_iso(anime_info["airing_at"])
+        airing_date = EventUtils.convert_timestamp_to_iso(anime_info["airing_at"])
         start_time = start_time or airing_date
         end_time = end_time or (datetime.fromisoformat(start_time) + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S")
 
@@ -353,7 +785,8 @@ def add_anime_episode(
         
         if track_uri:
             print("Calling notify_spotify_playback for Anime Episode Event with track_uri:", track_uri)
-            notify_spotify_playback(track_uri=track_uri, play_before=reminder_minutes)
+            reminder_time = (datetime.fromisoformat(start_time) - timedelta(minutes=reminder_minutes)).isoformat()
+            schedule_playback_cues([(track_uri, reminder_time)])
         
         # sms_body = f"New Episode Alert: {summary} on {start_time}. Check your calendar for details."
         # send_sms_notification(sms_body)
@@ -370,6 +803,49 @@ def add_anime_episode(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
         
+@app.post("/add-anime-episodes", summary="Add Events for Many Anime Episodes", tags=["Anime"])
+def add_anime_episodes(titles: List[str], reminder_minutes: int = 10):
+    """
+    Look up the next episode of every title and add them all to the calendar.
+
+    Titles are resolved with a few combined AniList queries and the events are
+    created with a single batch request.
+    """
+    try:
+        episodes = get_next_airing_episodes(titles)
+
+        scheduled = []
+        skipped = {}
+        operations = []
+        for title, anime_info in episodes.items():
+            if "message" in anime_info:
+                skipped[title] = anime_info["message"]
+                continue
+
+            airing_date = EventUtils.convert_timestamp_to_iso(anime_info["airing_at"])
+            end_time = (datetime.fromisoformat(airing_date) + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S")
+            summary = f"New Episode of {anime_info['title']} (Episode {anime_info['episode']})"
+            description = f"The next episode of {anime_info['title']} airs at {airing_date}."
+            operations.append({
+                "method": "insert",
+                "event": build_event_body(summary, description, airing_date, end_time, reminder_minutes)
+            })
+            scheduled.append({"title": anime_info["title"], "episode": anime_info["episode"], "airing_at": airing_date})
+
+        results = batch_write_events(operations)
+        for episode_info, result in zip(scheduled, results):
+            episode_info["event"] = result.get("event")
+            if not result["ok"]:
+                episode_info["error"] = result["error"]
+
+        return {
+            "message": f"{sum(result['ok'] for result in results)} anime episode events added",
+            "episodes": scheduled,
+            "skipped": skipped
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/schedule-movie-session", summary="Schedule Daytime Movie Session", tags=["Entertainment", "Calendar"])
 def schedule_movie_session(
     genre: str = "Action", 
@@ -411,7 +887,9 @@ def schedule_movie_session(
         
         if track_uri:
             print("Calling notify_spotify_playback for Movie Session with track_uri:", track_uri)
-            notify_spotify_playback(track_uri=track_uri, play_before=reminder_minutes)
+            start_dt = datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S%z')
+            reminder_time = (start_dt - timedelta(minutes=reminder_minutes)).strftime('%Y-%m-%dT%H:%M:%S%z')
+            schedule_playback_cues([(track_uri, reminder_time)])
             
         if use_ai:
     # AI-generated movie handling
@@ -444,15 +922,76 @@ def schedule_movie_session(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+@app.post("/schedule-movie-session/stream", summary="Schedule Daytime Movie Session (Streaming AI)", tags=["Entertainment", "Calendar"])
+def schedule_movie_session_stream(
+    genre: str = "Action", 
+    rating: float = 7.0, 
+    period: str = "1990s", 
+    start_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(hours=10)).strftime('%Y-%m-%dT%H:%M:%S%z'),
+    end_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(hours=12)).strftime('%Y-%m-%dT%H:%M:%S%z'),
+    reminder_minutes: int = 10,
+    track_uri: Optional[str] = None
+):
+    """
+    Server-sent events: a `token` event per chunk of Gemini's recommendation
+    as it is written, then an `event` message with the created calendar
+    event, or an `error` message.
+    """
+    try:
+        start_date, end_date = Utils.parse_period(period)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    def events():
+        try:
+            parts = []
+            yield from _stream_tokens(movie_ai_prompt(genre, rating, (start_date, end_date)), parts)
+            ai_text = "".join(parts).strip()
+
+            title_part = ai_text.split("\n")[0]
+            summary = f"{title_part} - {genre}"
+            description = f"Today's movie: {title_part} | {ai_text.split('* Description: ')[-1]}"
+            event = create_event(summary, description, start_time, end_time, reminder_minutes)
+
+            if track_uri:
+                start_dt = datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S%z')
+                reminder_time = (start_dt - timedelta(minutes=reminder_minutes)).strftime('%Y-%m-%dT%H:%M:%S%z')
+                schedule_playback_cues([(track_uri, reminder_time)])
+
+            yield _sse("event", {
+                "message": "Movie session scheduled successfully!",
+                "event": event,
+                "movie": {"title": title_part, "year": period, "rating": rating, "genre": genre}
+            })
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return _sse_response(events())
+
+@app.post("/movie-catalogue/refresh", summary="Rebuild Offline Movie Catalogue", tags=["Entertainment"], status_code=202)
+def rebuild_movie_catalogue(background_tasks: BackgroundTasks, pages_per_genre: int = Query(25, ge=1)):
+    """
+    Start rebuilding the catalogue from TMDB. The rebuild runs after the
+    response is sent; follow it with GET /movie-catalogue/refresh.
+    """
+    if not start_catalogue_refresh():
+        raise HTTPException(status_code=409, detail="A movie catalogue refresh is already running.")
+    background_tasks.add_task(run_catalogue_refresh, pages_per_genre)
+    return {"message": "Movie catalogue refresh started."}
+
+@app.get("/movie-catalogue/refresh", summary="Movie Catalogue Refresh Status", tags=["Entertainment"])
+def movie_catalogue_refresh_status():
+    return get_catalogue_refresh_status()
+
 @app.post("/schedule-running-event", summary="Schedule Running Event", tags=["Fitness", "Calendar"])
-def schedule_running_event(
+async def schedule_running_event(
     city: str,
     start_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%S%z'),
     end_time: str = (datetime.now(timezone('Europe/Amsterdam')) + timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M:%S%z'),
     reminder_minutes: int = 10,
 ):
     try:
-        weather = fetch_weather(city)
+        weather = await fetch_weather_async(city, at=datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%S%z'))
         weather_details = (
             f"Weather during your run: {weather['temperature']}°C, {weather['weather']}. "
             f"Humidity: {weather['humidity']}%. Wind Speed: {weather['wind_speed']} m/s."
@@ -461,7 +1000,7 @@ def schedule_running_event(
         summary = "Running Session"
         description = f"Running in {city}. {weather_details}"
 
-        event = create_event(summary, description, start_time, end_time, reminder_minutes)
+        event = await create_event_async(summary, description, start_time, end_time, reminder_minutes)
 
         return {
             "message": "Running event scheduled successfully!",
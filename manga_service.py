@@ -1,14 +1,14 @@
 from pytz import timezone
-import requests
-import time
+import http_client
 from datetime import datetime
 import webbrowser
 from calendar_service import create_event
+from scheduler_service import schedule_at
 
 
 def search_manga(title: str):
     url = f"https://api.mangadex.org/manga?title={title}"
-    response = requests.get(url)
+    response = http_client.get(url)
     data = response.json()
 
     if not data or "data" not in data:
@@ -23,7 +23,7 @@ def search_manga(title: str):
 
 def get_latest_manga_chapter(manga_id: str):
     url = f"https://api.mangadex.org/chapter?manga={manga_id}&limit=1&translatedLanguage[]=en"
-    response = requests.get(url)
+    response = http_client.get(url)
     data = response.json()
 
     if not data or "data" not in data:
@@ -36,23 +36,18 @@ def get_latest_manga_chapter(manga_id: str):
     return {"chapter_title": chapter_title, "chapter_url": chapter_url}
 
 
-def wait_until(target_time):
-    now = datetime.now(timezone('Europe/Amsterdam'))
-    wait_seconds = (target_time - now).total_seconds()
-    if wait_seconds > 0:
-        print(f"Waiting for {wait_seconds:.2f} seconds to open the chapter...")
-        time.sleep(wait_seconds)
-    else:
-        print("Target time has already passed. Opening immediately.")
+def open_chapter_url(chapter_url):
+    print(f"Opening chapter URL: {chapter_url}")
+    webbrowser.open(chapter_url)
 
 def open_chapter(chapter_url, target_time):
+    """Schedules the chapter to open at target_time without blocking a thread."""
     now = datetime.now(timezone('Europe/Amsterdam'))
-    wait_seconds = (target_time - now).total_seconds()
-    if wait_seconds > 0:
-        print(f"Waiting for {wait_seconds:.2f} seconds to open the chapter...")
-        time.sleep(wait_seconds)
-    print(f"Opening chapter URL: {chapter_url}")
-    webbrowser.open(chapter_url)
+    if target_time <= now:
+        print("Target time has already passed. Opening immediately.")
+    else:
+        print(f"Scheduling chapter to open in {(target_time - now).total_seconds():.2f} seconds...")
+    return schedule_at("manga_service:open_chapter_url", max(target_time, now), args=(chapter_url,))
 
 
 def add_manga_chapter_to_calendar(manga_title: str, start_time: str, end_time: str, reminder_minutes: int, chapter_url: str = None):
@@ -61,9 +56,6 @@ def add_manga_chapter_to_calendar(manga_title: str, start_time: str, end_time: s
     if chapter_url:
         summary = f"Reading Chapter of {manga_title}"
         description = f"Read the chapter here: {chapter_url}"
-        print(f"Scheduling to open chapter URL at {start_time_dt}.")
-        wait_until(start_time_dt)
-        open_chapter(chapter_url, start_time_dt)
     else:
         manga_info = search_manga(manga_title)
         if "message" in manga_info:
@@ -76,11 +68,11 @@ def add_manga_chapter_to_calendar(manga_title: str, start_time: str, end_time: s
         summary = f"New Chapter of {manga_info['title']} Available!"
         chapter_url = chapter_info["chapter_url"]
         description = f"Read the latest chapter here: {chapter_url}"
-        print(f"Scheduling to open chapter URL at {start_time_dt}.")
-        wait_until(start_time_dt)
-        open_chapter(chapter_url, start_time_dt)
 
     event = create_event(summary, description, start_time, end_time, reminder_minutes)
+    # After the insert, so a failed one leaves no persisted job behind
+    print(f"Scheduling to open chapter URL at {start_time_dt}.")
+    open_chapter(chapter_url, start_time_dt)
 
     return {
         "message": "Manga chapter event handled successfully.",
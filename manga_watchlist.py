@@ -0,0 +1,285 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from pytz import timezone
+
+import http_client
+from calendar_service import batch_write_events, build_event_body
+from scheduler_service import schedule_every
+
+MANGADEX_API = "https://api.mangadex.org"
+WATCHLIST_DB = os.getenv("MANGA_WATCHLIST_DB", os.path.join(os.path.dirname(__file__), "manga_watchlist.db"))
+POLL_INTERVAL_MINUTES = int(os.getenv("MANGA_POLL_INTERVAL_MINUTES", "60"))
+# Manga IDs per /chapter query; keeps the query string well under URL limits
+POLL_CHUNK_SIZE = 100
+PAGE_LIMIT = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    manga_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    last_chapter_id TEXT,
+    last_published TEXT
+);
+CREATE TABLE IF NOT EXISTS poll_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_lock = threading.RLock()
+_conn = None
+
+
+def _db():
+    global _conn
+    with _lock:
+        if _conn is None:
+            _conn = sqlite3.connect(WATCHLIST_DB, check_same_thread=False)
+            _conn.executescript(SCHEMA)
+        return _conn
+
+
+def _get_state(key):
+    with _lock:
+        row = _db().execute("SELECT value FROM poll_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_state(key, value):
+    with _lock, _db():
+        _db().execute("INSERT OR REPLACE INTO poll_state (key, value) VALUES (?, ?)", (key, value))
+
+
+def _mangadex_time(published_at: str):
+    """MangaDex returns offsets but only accepts naive UTC in publishAtSince."""
+    moment = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
+    return moment.astimezone(dt_timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _latest_chapter(manga_id: str):
+    response = http_client.get(f"{MANGADEX_API}/chapter", params={
+        "manga": manga_id,
+        "limit": 1,
+        "translatedLanguage[]": "en",
+        "order[publishAt]": "desc",
+    })
+    if response.status_code != 200:
+        return None
+    chapters = response.json().get("data", [])
+    return chapters[0] if chapters else None
+
+
+def add_to_watchlist(manga_id: str, title: str):
+    """Starts following a manga; its current latest chapter is the baseline."""
+    chapter = _latest_chapter(manga_id)
+    chapter_id = chapter["id"] if chapter else None
+    published = _mangadex_time(chapter["attributes"]["publishAt"]) if chapter else None
+
+    with _lock, _db():
+        _db().execute(
+            "INSERT OR REPLACE INTO watchlist (manga_id, title, last_chapter_id, last_published) VALUES (?, ?, ?, ?)",
+            (manga_id, title, chapter_id, published)
+        )
+    if _get_state("watermark") is None:
+        # Not the baseline: an old latest chapter would make every poll page through years of chapters
+        _set_state("watermark", datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S"))
+    return {"manga_id": manga_id, "title": title, "last_chapter_id": chapter_id, "last_published": published}
+
+
+def remove_from_watchlist(manga_id: str):
+    with _lock, _db():
+        _db().execute("DELETE FROM watchlist WHERE manga_id = ?", (manga_id,))
+
+
+def get_watchlist():
+    with _lock:
+        rows = _db().execute("SELECT manga_id, title, last_chapter_id, last_published FROM watchlist").fetchall()
+    return [
+        {"manga_id": manga_id, "title": title, "last_chapter_id": chapter_id, "last_published": published}
+        for manga_id, title, chapter_id, published in rows
+    ]
+
+
+def _validators_prefix(manga_ids, since: str):
+    return f"validators:{','.join(manga_ids)}:{since}:"
+
+
+def _fetch_chunk(manga_ids, since: str):
+    """
+    Returns (chapters, ok) for the chapters published since `since` for up to
+    POLL_CHUNK_SIZE manga.
+
+    A 304 from MangaDex (nothing changed since the previous identical query)
+    gives no chapters. ok is False when a page failed; the chapters are then
+    incomplete and no validators are stored, so the next poll asks again.
+    """
+    chapters = []
+    new_validators = {}
+    offset = 0
+    while True:
+        params = [("manga[]", manga_id) for manga_id in manga_ids] + [
+            ("translatedLanguage[]", "en"),
+            ("order[publishAt]", "desc"),
+            ("publishAtSince", since),
+            ("limit", PAGE_LIMIT),
+            ("offset", offset),
+        ]
+        # The query only changes when a new chapter moves the watermark, so the
+        # validators from the previous poll usually still apply
+        state_key = f"{_validators_prefix(manga_ids, since)}{offset}"
+        validators = _get_state(state_key)
+        headers = {}
+        if validators:
+            etag, last_modified = validators.split("\n")
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        try:
+            response = http_client.get(f"{MANGADEX_API}/chapter", params=params, headers=headers)
+        except Exception as e:
+            print(f"Failed to poll MangaDex chapters: {e}")
+            return chapters, False
+        if response.status_code == 304:
+            break
+        if response.status_code != 200:
+            print(f"Failed to poll MangaDex chapters: {response.status_code}")
+            return chapters, False
+
+        new_validators[state_key] = f"{response.headers.get('ETag', '')}\n{response.headers.get('Last-Modified', '')}"
+        data = response.json()
+        chapters.extend(data.get("data", []))
+        offset += PAGE_LIMIT
+        if offset >= data.get("total", 0):
+            break
+
+    # Stored only once every page arrived
+    for state_key, value in new_validators.items():
+        _set_state(state_key, value)
+    return chapters, True
+
+
+def _before(moment: str):
+    """One second before a _mangadex_time() value."""
+    earlier = datetime.strptime(moment, "%Y-%m-%dT%H:%M:%S") - timedelta(seconds=1)
+    return earlier.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _chapter_manga_id(chapter: dict):
+    for relationship in chapter.get("relationships", []):
+        if relationship["type"] == "manga":
+            return relationship["id"]
+    return None
+
+
+def poll_watchlist():
+    """
+    Checks every followed manga for new chapters and adds them to the calendar.
+
+    Followed manga are queried POLL_CHUNK_SIZE at a time, and only chapters
+    newer than the stored watermark are requested. A chapter only counts as
+    seen once its calendar event was created; failed ones are picked up again
+    by the next poll. Returns the new chapters with an 'added' flag.
+    """
+    watchlist = {entry["manga_id"]: entry for entry in get_watchlist()}
+    if not watchlist:
+        return []
+
+    since = _get_state("watermark") or datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+    manga_ids = sorted(watchlist)
+    new_chapters = []
+    chunk_of = {}
+    fetch_failed = False
+    for start in range(0, len(manga_ids), POLL_CHUNK_SIZE):
+        chunk = manga_ids[start:start + POLL_CHUNK_SIZE]
+        chunk_of.update((manga_id, chunk) for manga_id in chunk)
+        chapters, ok = _fetch_chunk(chunk, since)
+        if not ok:
+            # Incomplete: handled entirely by the next poll, and the watermark stays put
+            fetch_failed = True
+            continue
+        for chapter in chapters:
+            manga_id = _chapter_manga_id(chapter)
+            entry = watchlist.get(manga_id)
+            if entry is None or chapter["id"] == entry["last_chapter_id"]:
+                continue
+            published = _mangadex_time(chapter["attributes"]["publishAt"])
+            if entry["last_published"] and published <= entry["last_published"]:
+                continue
+            new_chapters.append((entry, chapter, published))
+
+    if not new_chapters:
+        return []
+
+    new_chapters.sort(key=lambda item: item[2])
+    start_time = datetime.now(timezone('Europe/Amsterdam')) + timedelta(minutes=30)
+    end_time = start_time + timedelta(minutes=30)
+    operations = []
+    for entry, chapter, published in new_chapters:
+        chapter_url = f"https://mangadex.org/chapter/{chapter['id']}"
+        chapter_number = chapter["attributes"].get("chapter")
+        summary = f"New Chapter of {entry['title']} Available!"
+        if chapter_number:
+            summary = f"New Chapter {chapter_number} of {entry['title']} Available!"
+        event = build_event_body(
+            summary, f"Read the latest chapter here: {chapter_url}",
+            start_time.isoformat(), end_time.isoformat(), 10
+        )
+        operations.append({"method": "insert", "event": event})
+
+    results = batch_write_events(operations)
+
+    # Oldest first per manga; the baseline stops before the first failed insert,
+    # so a later chapter may be added twice but a failed one is never skipped
+    updated = {}
+    blocked = set()
+    failed_published = []
+    retry_chunks = set()
+    for (entry, chapter, published), result in zip(new_chapters, results):
+        if not result["ok"]:
+            print(f"Failed to add chapter {chapter['id']} of {entry['title']}: {result['error']}")
+            blocked.add(entry["manga_id"])
+            failed_published.append(published)
+            retry_chunks.add(tuple(chunk_of[entry["manga_id"]]))
+        elif entry["manga_id"] not in blocked:
+            updated[entry["manga_id"]] = (chapter["id"], published)
+
+    with _lock, _db():
+        for manga_id, (chapter_id, published) in updated.items():
+            _db().execute(
+                "UPDATE watchlist SET last_chapter_id = ?, last_published = ? WHERE manga_id = ?",
+                (chapter_id, published, manga_id)
+            )
+    if fetch_failed:
+        watermark = since
+    elif failed_published:
+        # Keep the oldest failed chapter inside the next query's window
+        watermark = max(_before(min(failed_published)), since)
+    else:
+        watermark = max(max(published for _, _, published in new_chapters), since)
+    if watermark != since:
+        with _lock, _db():
+            # Queries with the old watermark will not be sent again
+            _db().execute("DELETE FROM poll_state WHERE key LIKE 'validators:%'")
+        _set_state("watermark", watermark)
+    else:
+        with _lock, _db():
+            # Otherwise the same query would get a 304 and never return the failed chapters
+            for chunk in retry_chunks:
+                prefix = _validators_prefix(chunk, since)
+                _db().execute("DELETE FROM poll_state WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    return [
+        {"manga_id": entry["manga_id"], "title": entry["title"], "chapter_id": chapter["id"],
+         "published": published, "added": result["ok"]}
+        for (entry, chapter, published), result in zip(new_chapters, results)
+    ]
+
+
+def schedule_polling():
+    schedule_every("manga_watchlist:poll_watchlist", POLL_INTERVAL_MINUTES * 60, job_id="manga-watchlist-poll")
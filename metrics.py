@@ -0,0 +1,168 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Prometheus' default latency buckets plus a few for slow AI and batch calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+_stats_sources = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+upstream_duration = Histogram(
+    "upstream_request_duration_seconds", "Latency of outbound calls to upstream APIs.", ("upstream", "operation")
+)
+upstream_requests = Counter(
+    "upstream_requests_total", "Outbound calls to upstream APIs by result status.", ("upstream", "operation", "status")
+)
+upstream_in_flight = Gauge(
+    "upstream_requests_in_flight", "Outbound calls to upstream APIs currently waiting for an answer.", ("upstream",)
+)
+route_duration = Histogram(
+    "http_request_duration_seconds", "Latency of requests handled by this service.", ("method", "route")
+)
+route_requests = Counter(
+    "http_requests_total", "Requests handled by this service by response status.", ("method", "route", "status")
+)
+route_in_flight = Gauge(
+    "http_requests_in_flight", "Requests currently being handled by this service.", ("method", "route")
+)
+
+
+class _Call:
+    """Handed out by track_upstream; set .status once the upstream has answered."""
+
+    def __init__(self):
+        self.status = "ok"
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """
+    Times one outbound call and records its status.
+
+    An exception leaving the block is counted with status "error" and re-raised.
+    """
+    call = _Call()
+    upstream_in_flight.inc(upstream=upstream)
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call.status = "error"
+        raise
+    finally:
+        upstream_duration.observe(time.perf_counter() - started, upstream=upstream, operation=operation)
+        upstream_requests.inc(upstream=upstream, operation=operation, status=call.status)
+        upstream_in_flight.dec(upstream=upstream)
+
+
+def register_stats(name: str, help_text: str, source):
+    """
+    Exposes an existing stats dict as a gauge with one sample per key.
+
+    `source` is called on every scrape and must return a dict of numbers.
+    """
+    _stats_sources.append((name, help_text, source))
+
+
+def render():
+    """Returns every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for name, help_text, source in _stats_sources:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for key, value in sorted(source().items()):
+            lines.append(f'{name}{{stat="{_escape(key)}"}} {_format_value(value)}')
+    return "\n".join(lines) + "\n"
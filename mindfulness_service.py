@@ -1,10 +1,10 @@
 import os
 from random import choice
-import requests
+import http_client
 
 API_NINJAS_KEY = os.getenv("API_NINJAS_KEY")
 
-def get_mindfulness_quote():
+def _quote_url():
     mindfulness_categories = [
         'calm',
         'courage',
@@ -26,16 +26,29 @@ def get_mindfulness_quote():
     category = choice(mindfulness_categories)
     print(f"Selected Category: {category}")
 
-    api_url = 'https://api.api-ninjas.com/v1/quotes?category={}'.format(category)
-    
-    response = requests.get(api_url, headers={'X-Api-Key': API_NINJAS_KEY})
+    return 'https://api.api-ninjas.com/v1/quotes?category={}'.format(category)
+
+def _format_quote(data):
+    if data:
+        quote = data[0].get("quote", "No quote available")
+        author = data[0].get("author", "Unknown")
+        return f"{quote} - {author}"
+
+def get_mindfulness_quote():
+    response = http_client.get(_quote_url(), headers={'X-Api-Key': API_NINJAS_KEY})
 
     if response.status_code == 200:
-        data = response.json()
-        if data:
-            quote = data[0].get("quote", "No quote available")
-            author = data[0].get("author", "Unknown")
-            return f"{quote} - {author}"
+        return _format_quote(response.json())
     else:
         print(f"Failed to retrieve quote. Status code: {response.status_code}, Response: {response.text}")
-        return "Error retrieving mindfulness message, please try again later."
\ No newline at end of file
+        return "Error retrieving mindfulness message, please try again later."
+
+async def get_mindfulness_quote_async():
+    """Async counterpart of get_mindfulness_quote."""
+    status, data = await http_client.fetch_json("GET", _quote_url(), headers={'X-Api-Key': API_NINJAS_KEY})
+
+    if status == 200:
+        return _format_quote(data)
+    else:
+        print(f"Failed to retrieve quote. Status code: {status}, Response: {data}")
+        return "Error retrieving mindfulness message, please try again later."
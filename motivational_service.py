@@ -1,9 +1,11 @@
-import requests
+import http_client
+
+QUOTE_URL = "https://zenquotes.io/api/random"
 
 
 def get_motivational_quote():
     try:
-        response = requests.get("https://zenquotes.io/api/random")
+        response = http_client.get(QUOTE_URL)
         if response.status_code == 200:
             data = response.json()
             quote = data[0]['q']
@@ -13,4 +15,17 @@ def get_motivational_quote():
             return "Unable to fetch a quote at the moment."
     except Exception as e:
         print(f"Error fetching quote: {e}")
-        return "Stay inspired and keep pushing!"
\ No newline at end of file
+        return "Stay inspired and keep pushing!"
+
+
+async def get_motivational_quote_async():
+    """Async counterpart of get_motivational_quote."""
+    try:
+        status, data = await http_client.fetch_json("GET", QUOTE_URL)
+        if status == 200:
+            return f"{data[0]['q']} - {data[0]['a']}"
+        else:
+            return "Unable to fetch a quote at the moment."
+    except Exception as e:
+        print(f"Error fetching quote: {e}")
+        return "Stay inspired and keep pushing!"
@@ -0,0 +1,186 @@
+import json
+import os
+import shutil
+import sys
+import time
+from random import randrange
+
+import numpy as np
+
+# Every TMDB movie genre, in bit order. The genre column stores one bit per genre.
+GENRE_IDS = [28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 10770, 53, 10752, 37]
+GENRE_BITS = {genre_id: 1 << bit for bit, genre_id in enumerate(GENRE_IDS)}
+
+COLUMNS = {
+    "id": np.int32,
+    "rating": np.float32,
+    "votes": np.int32,
+    "release": np.int32,  # release date as YYYYMMDD, 0 when unknown
+    "genres": np.uint32,
+}
+TITLES_FILE = "titles.json"
+# Names the version directory readers should open; replaced in one step after a build
+CURRENT_FILE = "CURRENT"
+
+
+def date_key(date: str) -> int:
+    """'1994-09-23' -> 19940923, so date ranges become integer comparisons."""
+    try:
+        return int(date[:10].replace("-", ""))
+    except (TypeError, ValueError):
+        return 0
+
+
+def genre_mask(movie: dict) -> int:
+    genre_ids = movie.get("genre_ids") or [genre["id"] for genre in movie.get("genres", [])]
+    mask = 0
+    for genre_id in genre_ids:
+        mask |= GENRE_BITS.get(genre_id, 0)
+    return mask
+
+
+def current_version(directory: str):
+    """
+    Returns the directory holding the live catalogue files, or None.
+
+    Builds go to their own version directory and CURRENT is switched last, so
+    readers always see the columns and titles of one build. A catalogue
+    written before versioning (files directly in `directory`) is still read.
+    """
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as current_file:
+            return os.path.join(directory, current_file.read().strip())
+    except FileNotFoundError:
+        pass
+    if all(os.path.exists(os.path.join(directory, f"{name}.npy")) for name in COLUMNS):
+        return directory
+    return None
+
+
+def _remove_old_versions(directory: str, keep):
+    # A version still memory-mapped by a reader cannot be removed on Windows; it goes on a later build
+    for name in os.listdir(directory):
+        if name.startswith("v") and name not in keep and os.path.isdir(os.path.join(directory, name)):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def build_catalogue(movies, directory: str):
+    """
+    Writes a column-oriented catalogue of TMDB movies to `directory`.
+
+    `movies` is any iterable of TMDB movie objects, e.g. discover results or
+    the lines of a JSON dump. Duplicates are collapsed on id, last one wins.
+
+    Every build goes to a new version directory, so files a running reader
+    has mapped are never overwritten; CURRENT then points at the new one.
+    """
+    by_id = {}
+    for movie in movies:
+        if movie.get("id") is not None:
+            by_id[movie["id"]] = movie
+    rows = list(by_id.values())
+
+    columns = {
+        "id": [movie["id"] for movie in rows],
+        "rating": [movie.get("vote_average") or 0 for movie in rows],
+        "votes": [movie.get("vote_count") or 0 for movie in rows],
+        "release": [date_key(movie.get("release_date")) for movie in rows],
+        "genres": [genre_mask(movie) for movie in rows],
+    }
+
+    previous = current_version(directory)
+    version = f"v{time.time_ns()}"
+    version_dir = os.path.join(directory, version)
+    os.makedirs(version_dir)
+    for name, dtype in COLUMNS.items():
+        with open(os.path.join(version_dir, f"{name}.npy"), "wb") as column_file:
+            np.save(column_file, np.asarray(columns[name], dtype=dtype))
+
+    titles = [[movie.get("title", ""), movie.get("release_date", "")] for movie in rows]
+    with open(os.path.join(version_dir, TITLES_FILE), "w", encoding="utf-8") as titles_file:
+        json.dump(titles, titles_file)
+
+    pointer = os.path.join(directory, CURRENT_FILE)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as current_file:
+        current_file.write(version)
+    os.replace(pointer + ".tmp", pointer)
+
+    # The previous version may still be open in this or another process
+    _remove_old_versions(directory, {version, os.path.basename(previous or "")})
+    return len(rows)
+
+
+def read_dump(path: str):
+    """Yields movie objects from a JSON-lines TMDB dump."""
+    with open(path, encoding="utf-8") as dump:
+        for line in dump:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def catalogue_exists(directory: str) -> bool:
+    return current_version(directory) is not None
+
+
+class MovieCatalogue:
+    """
+    Read-only, memory-mapped movie catalogue.
+
+    The numeric columns are mapped straight from disk, so loading is instant
+    and filters run as vectorized comparisons over the whole catalogue.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        # Resolved once, so every file comes from the same build
+        self.version_dir = current_version(directory)
+        if self.version_dir is None:
+            raise FileNotFoundError(f"No movie catalogue in {directory}")
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(self.version_dir, f"{name}.npy"), mmap_mode="r"))
+        with open(os.path.join(self.version_dir, TITLES_FILE), encoding="utf-8") as titles_file:
+            self.titles = json.load(titles_file)
+
+    def __len__(self):
+        return len(self.id)
+
+    def filter(self, min_rating: float, release_start: str, release_end: str, genre_id=None, vote_count: int = 50):
+        """Returns the row indices of every movie matching the filters."""
+        mask = (
+            (self.rating >= min_rating)
+            & (self.votes >= vote_count)
+            & (self.release >= date_key(release_start))
+            & (self.release <= date_key(release_end))
+        )
+        if genre_id:
+            mask &= (self.genres & GENRE_BITS.get(genre_id, 0)) != 0
+        return np.flatnonzero(mask)
+
+    def movie(self, index: int) -> dict:
+        """Rebuilds the TMDB-style fields the endpoints use for one row."""
+        title, release_date = self.titles[index]
+        return {
+            "id": int(self.id[index]),
+            "title": title,
+            "release_date": release_date,
+            "vote_average": round(float(self.rating[index]), 1),
+            "vote_count": int(self.votes[index]),
+            "genre_ids": [genre_id for genre_id, bit in GENRE_BITS.items() if int(self.genres[index]) & bit],
+        }
+
+    def pick(self, min_rating: float, release_start: str, release_end: str, genre_id=None, vote_count: int = 50):
+        """Returns one random matching movie, or None when nothing matches."""
+        matches = self.filter(min_rating, release_start, release_end, genre_id, vote_count)
+        if not len(matches):
+            return None
+        return self.movie(int(matches[randrange(len(matches))]))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python movie_catalogue.py <tmdb_dump.jsonl> [catalogue_dir]")
+        sys.exit(1)
+    target = sys.argv[2] if len(sys.argv) == 3 else os.path.join(os.path.dirname(__file__), "movie_catalogue")
+    count = build_catalogue(read_dump(sys.argv[1]), target)
+    print(f"Wrote {count} movies to {target}")
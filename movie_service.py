@@ -1,19 +1,80 @@
 from random import choice
 from typing import Optional
-import requests
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import http_client
 import os
+import singleflight
+
+from cachetools import TTLCache
+
 
 BASE_URL = "https://api.themoviedb.org/3"
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 
-def get_movies_with_high_ratings(
-    min_rating: float = 7.0,
-    vote_count: int = 50,
-    release_start: str = '1990-01-01',
-    release_end: str = '1999-12-31',
-    genre_id: Optional[int] = None
+# Discover results are cached per (genre, rating, vote count, date range)
+DISCOVER_CACHE_SIZE = int(os.getenv("TMDB_DISCOVER_CACHE_SIZE", "128"))
+DISCOVER_CACHE_TTL = int(os.getenv("TMDB_DISCOVER_CACHE_TTL", "21600"))
+# Pages fetched per query: page 1 synchronously, the rest in the background
+DISCOVER_PREFETCH_PAGES = int(os.getenv("TMDB_DISCOVER_PREFETCH_PAGES", "5"))
+
+MOVIE_CATALOGUE_DIR = os.getenv("MOVIE_CATALOGUE_DIR", os.path.join(os.path.dirname(__file__), "movie_catalogue"))
+# Discover pages pulled per genre when refreshing the offline catalogue
+CATALOGUE_REFRESH_PAGES = int(os.getenv("MOVIE_CATALOGUE_REFRESH_PAGES", "25"))
+# Threads of the refresh's own pool; kept apart from the request-path prefetch pool
+CATALOGUE_REFRESH_WORKERS = int(os.getenv("MOVIE_CATALOGUE_REFRESH_WORKERS", "4"))
+
+_discover_cache = TTLCache(maxsize=DISCOVER_CACHE_SIZE, ttl=DISCOVER_CACHE_TTL)
+_discover_lock = threading.Lock()
+_prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tmdb-prefetch")
+# Concurrent misses for the same filters share one page-1 fetch and one prefetch
+_inflight = singleflight.group("tmdb")
+
+def _fetch_discover_page(params: dict, page: int):
+    """Returns (results, total_pages) for one discover page, or None on failure."""
+    response = http_client.get(f"{BASE_URL}/discover/movie", params={**params, 'page': page})
+    if response.status_code != 200:
+        print(f"Failed to fetch movie data: {response.status_code}")
+        return None
+    data = response.json()
+    return data.get('results', []), data.get('total_pages', 1)
+
+def _add_prefetched_page(key, future):
+    result = future.result() if not future.exception() else None
+    if not result:
+        return
+    with _discover_lock:
+        entry = _discover_cache.get(key)
+        if entry is not None:
+            # Replace rather than mutate, readers may be iterating the old list
+            entry['movies'] = entry['movies'] + result[0]
+
+def _prefetch_pages(key, params: dict, pages):
+    for page in pages:
+        future = _prefetch_pool.submit(_fetch_discover_page, params, page)
+        future.add_done_callback(lambda done: _add_prefetched_page(key, done))
+
+def discover_movies(
+    min_rating: float,
+    release_start: str,
+    release_end: str,
+    genre_id: Optional[int] = None,
+    vote_count: int = 50
 ):
-    url = f"{BASE_URL}/discover/movie"
+    """
+    Returns highly rated movies matching the filters, served from cache when possible.
+
+    On a miss only page 1 is fetched before returning; the next pages are
+    fetched in parallel in the background and added to the cached candidates.
+    Returns None when TMDB could not be reached.
+    """
+    key = (genre_id, min_rating, vote_count, release_start, release_end)
+    with _discover_lock:
+        entry = _discover_cache.get(key)
+    if entry is not None:
+        return entry['movies']
+
     params = {
         'api_key': TMDB_API_KEY,
         'language': 'en-US',
@@ -22,24 +83,124 @@ def get_movies_with_high_ratings(
         'vote_average.gte': min_rating,
         'primary_release_date.gte': release_start,
         'primary_release_date.lte': release_end,
-        'page': 1
     }
-    
     if genre_id:
         params['with_genres'] = genre_id
 
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        return response.json().get('results', [])
-    else:
-        print(f"Failed to fetch movie data: {response.status_code}")
-        return []
+    def load():
+        with _discover_lock:
+            # Another caller may have filled the entry since the check above
+            entry = _discover_cache.get(key)
+        if entry is not None:
+            return entry['movies']
+
+        first_page = _fetch_discover_page(params, 1)
+        if first_page is None:
+            return None
+        movies, total_pages = first_page
+
+        with _discover_lock:
+            _discover_cache[key] = {'movies': movies}
+
+        remaining = range(2, min(total_pages, DISCOVER_PREFETCH_PAGES) + 1)
+        _prefetch_pages(key, params, remaining)
+        return movies
+
+    return _inflight.do(key, load)
+
+_catalogue = None
+_catalogue_lock = threading.Lock()
+# Held while a rebuild runs, so two refreshes never pull TMDB at the same time
+_refresh_lock = threading.Lock()
+_refresh_status = {"running": False, "movies": None, "error": None, "finished_at": None}
+
+def get_movie_catalogue():
+    """Returns the offline catalogue, or None if it has not been built yet."""
+    global _catalogue
+    # Imported here so numpy is only loaded once the catalogue is used
+    from movie_catalogue import MovieCatalogue, catalogue_exists
+
+    if _catalogue is None and catalogue_exists(MOVIE_CATALOGUE_DIR):
+        with _catalogue_lock:
+            if _catalogue is None:
+                _catalogue = MovieCatalogue(MOVIE_CATALOGUE_DIR)
+    return _catalogue
+
+def refresh_movie_catalogue(pages_per_genre: int = CATALOGUE_REFRESH_PAGES):
+    """
+    Rebuilds the offline catalogue from TMDB.
+
+    Pulls the most-voted movies of every genre plus everything already in the
+    discover cache, writes the catalogue as a new version and swaps it in.
+    Takes a few hundred TMDB calls, so endpoints run it in the background.
+    """
+    global _catalogue
+    from movie_catalogue import GENRE_IDS, MovieCatalogue, build_catalogue
+
+    base_params = {
+        'api_key': TMDB_API_KEY,
+        'language': 'en-US',
+        'sort_by': 'vote_count.desc',
+        'vote_count.gte': 50,
+    }
+    jobs = [
+        ({**base_params, 'with_genres': genre_id}, page)
+        for genre_id in GENRE_IDS
+        for page in range(1, pages_per_genre + 1)
+    ]
+    # Not _prefetch_pool: hundreds of refresh pages would queue ahead of live prefetches
+    with ThreadPoolExecutor(max_workers=CATALOGUE_REFRESH_WORKERS, thread_name_prefix="tmdb-catalogue") as pool:
+        pages = list(pool.map(lambda job: _fetch_discover_page(*job), jobs))
+    movies = [movie for page in pages if page for movie in page[0]]
+
+    with _discover_lock:
+        movies.extend(movie for entry in _discover_cache.values() for movie in entry['movies'])
+
+    count = build_catalogue(movies, MOVIE_CATALOGUE_DIR)
+    with _catalogue_lock:
+        _catalogue = MovieCatalogue(MOVIE_CATALOGUE_DIR)
+    return count
+
+def start_catalogue_refresh():
+    """Claims the refresh slot; returns False when a refresh is already running."""
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+    _refresh_status.update(running=True, error=None)
+    return True
+
+def run_catalogue_refresh(pages_per_genre: int = CATALOGUE_REFRESH_PAGES):
+    """Runs a refresh claimed with start_catalogue_refresh() and records the outcome."""
+    try:
+        _refresh_status["movies"] = refresh_movie_catalogue(pages_per_genre)
+    except Exception as e:
+        print(f"Failed to rebuild movie catalogue: {e}")
+        _refresh_status["error"] = str(e)
+    finally:
+        _refresh_status.update(running=False, finished_at=time.time())
+        _refresh_lock.release()
+
+def get_catalogue_refresh_status():
+    return dict(_refresh_status)
+
+def get_movies_with_high_ratings(
+    min_rating: float = 7.0,
+    vote_count: int = 50,
+    release_start: str = '1990-01-01',
+    release_end: str = '1999-12-31',
+    genre_id: Optional[int] = None
+):
+    movies = discover_movies(min_rating, release_start, release_end, genre_id, vote_count)
+    return movies or []
     
-import os
-import google.generativeai as genai
+from gemini_service import generate_cached
 
-# Load API Key
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+def movie_ai_prompt(genre: str, rating: float, period):
+    return (
+        f"Unearth a hidden gem from the {period}—a must-watch {genre} movie that might have been overshadowed by blockbusters but still holds a cult following or critical acclaim. "
+        f"The film should have at least a {rating} IMDb rating and deliver an unforgettable experience. "
+        "Provide the movie title, its release year, and a compelling reason why it's worth watching. "
+        "Highlight its unique qualities, whether it's an underrated performance, a visionary director, or an ahead-of-its-time storyline."
+    )
 
 def recommend_movie_with_ai(genre: str, rating: float, period: str):
     """
@@ -50,16 +211,10 @@ def recommend_movie_with_ai(genre: str, rating: float, period: str):
     :param period: Time period for the movie (e.g., "1990s").
     :return: A dictionary with movie details or a fallback recommendation.
     """
-    prompt = (
-        f"Unearth a hidden gem from the {period}—a must-watch {genre} movie that might have been overshadowed by blockbusters but still holds a cult following or critical acclaim. "
-        f"The film should have at least a {rating} IMDb rating and deliver an unforgettable experience. "
-        "Provide the movie title, its release year, and a compelling reason why it's worth watching. "
-        "Highlight its unique qualities, whether it's an underrated performance, a visionary director, or an ahead-of-its-time storyline."
-    )
-
     try:
-        response = genai.GenerativeModel("gemini-pro").generate_content(prompt)
-        ai_text = response.text.strip()
+        ai_text = generate_cached(movie_ai_prompt(genre, rating, period))
+        if ai_text.startswith("Error: "):
+            raise RuntimeError(ai_text)
 
         # Parse AI response (adjust based on actual AI response structure)
         movie = {"title": ai_text, "year": period, "rating": rating, "genre": genre}
@@ -111,30 +266,20 @@ def fetch_movie_recommendation(genre, rating, period):
         raise ValueError("Period should be a tuple with two date strings, e.g., ('1990-01-01', '1999-12-31')")
 
     genre_id = get_genre_id(genre)
+
+    catalogue = get_movie_catalogue()
+    if catalogue is not None:
+        movie = catalogue.pick(rating, start_date, end_date, genre_id)
+        if movie:
+            return movie
     
-    params = {
-        'api_key': TMDB_API_KEY,
-        'language': 'en-US',
-        'sort_by': 'vote_average.desc',
-        'vote_count.gte': 50,
-        'vote_average.gte': rating,
-        'primary_release_date.gte': start_date,
-        'primary_release_date.lte': end_date,
-        'with_genres': genre_id,
-        'page': 1
-    }
-    
-    response = requests.get(f"{BASE_URL}/discover/movie", params=params)
-
-    if response.status_code == 200:
-        movies = response.json().get('results', [])
-        if movies:
-            return choice(movies)
-        else:
-            return {"message": "No movies found with the specified criteria."}
-    else:
-        print(f"Failed to fetch movie data: {response.status_code}")
+    movies = discover_movies(rating, start_date, end_date, genre_id)
+
+    if movies is None:
         return {"message": "Failed to retrieve movie recommendation."}
+    if movies:
+        return choice(movies)
+    return {"message": "No movies found with the specified criteria."}
     
 def get_genre_id(genre_name):
     """
@@ -0,0 +1,145 @@
+import os
+import queue
+import sys
+import threading
+
+import http_client
+
+# Comma-separated backends that receive every notification: toast, sms (digests), log, webhook
+NOTIFICATION_BACKENDS = os.getenv("NOTIFICATION_BACKENDS", "toast" if sys.platform == "win32" else "log")
+NOTIFICATION_WEBHOOK_URL = os.getenv("NOTIFICATION_WEBHOOK_URL")
+# Notifications waiting per backend; beyond this new ones are dropped, not blocked on
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "1000"))
+
+
+def _send_toast(notification):
+    from notification_service import get_toaster, snooze_notification
+
+    snooze_summary = notification.get("snooze_summary")
+    get_toaster().show_toast(
+        notification["title"],
+        notification["message"],
+        duration=5,
+        callback_on_click=(lambda: snooze_notification(snooze_summary)) if snooze_summary else None
+    )
+
+
+def _send_sms(notification):
+    # Batched into digests and rate limited by the SMS queue
+    from sms_queue import enqueue_sms
+
+    enqueue_sms(f"{notification['title']}: {notification['message']}")
+
+
+def _send_log(notification):
+    print(f"[notification] {notification['title']}: {notification['message']}")
+
+
+def _send_webhook(notification):
+    if not NOTIFICATION_WEBHOOK_URL:
+        raise RuntimeError("NOTIFICATION_WEBHOOK_URL is not set")
+    response = http_client.post(NOTIFICATION_WEBHOOK_URL, json=notification)
+    response.raise_for_status()
+
+
+BACKENDS = {
+    "toast": _send_toast,
+    "sms": _send_sms,
+    "log": _send_log,
+    "webhook": _send_webhook,
+}
+
+
+class _BackendWorker:
+    """Queue plus worker thread for one backend, so a slow backend (a 5 s toast) never delays the others."""
+
+    def __init__(self, name, send, count):
+        self.name = name
+        self._send = send
+        self._count = count
+        self.queue = queue.Queue(maxsize=NOTIFICATION_QUEUE_SIZE)
+        self.thread = threading.Thread(target=self._run, name=f"notify-{name}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            notification = self.queue.get()
+            if notification is None:
+                return
+            try:
+                self._send(notification)
+                self._count("delivered")
+            except Exception as e:
+                self._count("failed")
+                print(f"Notification backend '{self.name}' failed: {e}")
+
+
+class NotificationDispatcher:
+    """
+    Fans notifications out to the configured backends without blocking the caller.
+
+    notify() only puts the notification on each backend's queue; a dedicated
+    worker per backend delivers it.
+    """
+
+    def __init__(self, backends=NOTIFICATION_BACKENDS):
+        names = [name.strip() for name in backends.split(",") if name.strip()]
+        unknown = [name for name in names if name not in BACKENDS]
+        if unknown:
+            raise ValueError(f"Unknown notification backends: {', '.join(unknown)}")
+        self.stats = {"queued": 0, "delivered": 0, "failed": 0, "dropped": 0}
+        self._stats_lock = threading.Lock()
+        self._workers = [_BackendWorker(name, BACKENDS[name], self._count) for name in names]
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def notify(self, title: str, message: str, snooze_summary: str = None):
+        notification = {"title": title, "message": message, "snooze_summary": snooze_summary}
+        for worker in self._workers:
+            try:
+                worker.queue.put_nowait(notification)
+                self._count("queued")
+            except queue.Full:
+                self._count("dropped")
+
+    def close(self, timeout: float = 5.0):
+        """Lets the workers finish what is queued, waiting at most `timeout` seconds per backend."""
+        for worker in self._workers:
+            try:
+                worker.queue.put(None, timeout=timeout)
+            except queue.Full:
+                continue
+        for worker in self._workers:
+            worker.thread.join(timeout)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = NotificationDispatcher()
+    return _dispatcher
+
+
+def notify(title: str, message: str, snooze_summary: str = None):
+    """Queues a notification for every configured backend and returns immediately."""
+    get_dispatcher().notify(title, message, snooze_summary)
+
+
+def get_stats():
+    return dict(_dispatcher.stats) if _dispatcher is not None else {"queued": 0, "delivered": 0, "failed": 0, "dropped": 0}
+
+
+def close():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.close()
+            _dispatcher = None
@@ -1,24 +1,44 @@
 import os
-import time
+import threading
 from dotenv import load_dotenv
 from fastapi import HTTPException
-from win10toast_click import ToastNotifier
-import vonage
+
+from scheduler_service import schedule_in
 
 load_dotenv()
-toaster = ToastNotifier()
 
 SENDER_NAME = "EventNotifier"
 VONAGE_API_KEY = os.getenv("VONAGE_API_KEY")
 VONAGE_API_SECRET = os.getenv("VONAGE_API_SECRET")
 USER_PHONE_NUMBER = os.getenv("USER_PHONE_NUMBER")
 
-client = vonage.Client(key=VONAGE_API_KEY, secret=VONAGE_API_SECRET)
-sms = vonage.Sms(client)
+# The toast and SMS clients are created on first use, so importing this
+# module neither loads their SDKs nor opens anything.
+_toaster = None
+_sms = None
+_clients_lock = threading.Lock()
+
+def get_toaster():
+    global _toaster
+    if _toaster is None:
+        with _clients_lock:
+            if _toaster is None:
+                from win10toast_click import ToastNotifier
+                _toaster = ToastNotifier()
+    return _toaster
+
+def get_sms_client():
+    global _sms
+    if _sms is None:
+        with _clients_lock:
+            if _sms is None:
+                import vonage
+                _sms = vonage.Sms(vonage.Client(key=VONAGE_API_KEY, secret=VONAGE_API_SECRET))
+    return _sms
 
 def send_sms_notification(sms_body):
     try:
-        responseData = sms.send_message({
+        responseData = get_sms_client().send_message({
             "from": SENDER_NAME,
             "to": USER_PHONE_NUMBER,
             "text": sms_body,
@@ -32,6 +52,9 @@ def send_sms_notification(sms_body):
         print(f"Failed to send SMS: {e}")
         raise HTTPException(status_code=500, detail="Failed to send SMS")
 
+def show_snoozed_reminder(summary):
+    from notification_dispatcher import notify
+    notify("Snoozed Reminder", f"{summary} reminder again!")
+
 def snooze_notification(summary, delay=600):
-    time.sleep(delay)
-    toaster.show_toast("Snoozed Reminder", f"{summary} reminder again!", duration=5)
\ No newline at end of file
+    schedule_in("notification_service:show_snoozed_reminder", delay, args=(summary,))
\ No newline at end of file
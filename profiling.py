@@ -0,0 +1,209 @@
+import asyncio
+import functools
+import heapq
+import hmac
+import itertools
+import os
+import random
+import sys
+import threading
+import uuid
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+
+from fastapi.routing import APIRoute
+
+# Profiling is off unless explicitly enabled
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+# When set, the X-Profile header or ?profile= value must equal this token
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+# Fraction of all requests profiled without being asked, to fill the slowest buffer
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.005"))
+PROFILING_KEEP = int(os.getenv("PROFILING_KEEP", "20"))
+
+_active = ContextVar("active_profile", default=None)
+_wrapper_codes = set()
+_lock = threading.Lock()
+_recent = deque(maxlen=PROFILING_KEEP)
+_slowest = []
+_order = itertools.count()
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame):
+    """Root-to-leaf stack in collapsed format, cut off at the endpoint wrapper."""
+    names = []
+    while frame is not None and frame.f_code not in _wrapper_codes:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RequestProfile:
+    """
+    Sampling profiler for a single request.
+
+    A background thread periodically reads the stacks of the threads that are
+    running this request's endpoint, so other requests handled at the same
+    time are not included. Output is in the collapsed-stack format read by
+    flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, method: str, path: str, interval: float = PROFILING_INTERVAL):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.duration = None
+        self.status = None
+        self.stacks = Counter()
+        self._threads = set()
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+
+    def attach(self):
+        with self._threads_lock:
+            self._threads.add(threading.get_ident())
+
+    def detach(self):
+        with self._threads_lock:
+            self._threads.discard(threading.get_ident())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._threads_lock:
+                threads = list(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_collapse(frame)] += 1
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self, duration: float, status: int):
+        self._stop.set()
+        self._sampler.join()
+        self.duration = duration
+        self.status = status
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common() if stack)
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 1),
+            "samples": sum(self.stacks.values()),
+        }
+
+
+def _profiled(endpoint):
+    """Wraps an endpoint so the thread running it is sampled when its request is profiled."""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            profile = _active.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            # Async endpoints share the event loop thread, so concurrent
+            # requests can show up in their samples.
+            profile.attach()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.detach()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            profile = _active.get()
+            if profile is None:
+                return endpoint(*args, **kwargs)
+            profile.attach()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                profile.detach()
+
+    _wrapper_codes.add(wrapper.__code__)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose endpoint can be profiled per request; install as app.router.route_class."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+
+def wants_profile(headers, query_params):
+    """Whether this request should be profiled, based on config and the X-Profile header or ?profile= flag."""
+    if not PROFILING_ENABLED:
+        return False
+    requested = headers.get("x-profile") or query_params.get("profile")
+    if requested:
+        return requested == PROFILING_TOKEN if PROFILING_TOKEN else requested.lower() in ("1", "true", "yes")
+    return random.random() < PROFILING_SAMPLE_RATE
+
+
+def can_read_profiles(headers, query_params):
+    """
+    Whether a request may read collected profiles.
+
+    With PROFILING_TOKEN set, the X-Profile header or ?profile= value must
+    carry it, the same opt-in that turns profiling on for a request.
+    """
+    if not PROFILING_TOKEN:
+        return True
+    given = headers.get("x-profile") or query_params.get("profile") or ""
+    return hmac.compare_digest(given.encode(), PROFILING_TOKEN.encode())
+
+
+def start_profile(method: str, path: str):
+    profile = RequestProfile(method, path)
+    profile.start()
+    token = _active.set(profile)
+    return profile, token
+
+
+def finish_profile(profile: RequestProfile, token, duration: float, status: int):
+    _active.reset(token)
+    profile.stop(duration, status)
+    with _lock:
+        _recent.append(profile)
+        entry = (duration, next(_order), profile)
+        if len(_slowest) < PROFILING_KEEP:
+            heapq.heappush(_slowest, entry)
+        else:
+            heapq.heappushpop(_slowest, entry)
+
+
+def slowest_profiles():
+    """Summaries of the PROFILING_KEEP slowest profiled requests, slowest first."""
+    with _lock:
+        entries = sorted(_slowest, reverse=True)
+    return [profile.summary() for _, _, profile in entries]
+
+
+def get_profile(profile_id: str):
+    with _lock:
+        candidates = list(_recent) + [profile for _, _, profile in _slowest]
+    for profile in candidates:
+        if profile.id == profile_id:
+            return profile
+    return None
@@ -0,0 +1,144 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pytz import timezone
+
+SCHEDULER_DB = os.getenv("SCHEDULER_DB", os.path.join(os.path.dirname(__file__), "scheduler_jobs.sqlite"))
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+# Only the process holding this lock runs jobs; the others just add them to the store
+SCHEDULER_LOCK_FILE = os.getenv("SCHEDULER_LOCK_FILE", SCHEDULER_DB + ".lock")
+# How often the job-running process rechecks the store for jobs other processes added,
+# and how often the others try to take over when it exits
+SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "10"))
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_lock_handle = None
+
+
+def _try_lock(path):
+    """Takes an exclusive, non-blocking lock on `path`; returns the open file, or None if another process holds it."""
+    handle = open(path, "a+")
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def _coordinate(scheduler):
+    """
+    Keeps exactly one process running jobs.
+
+    With several uvicorn workers every process has a scheduler on the same
+    job store; only the one holding SCHEDULER_LOCK_FILE is unpaused. It wakes
+    up every SCHEDULER_POLL_SECONDS so jobs added by other workers are seen,
+    and when it exits (releasing the lock) another worker takes over.
+    """
+    global _lock_handle
+    while _scheduler is scheduler:
+        if _lock_handle is None:
+            _lock_handle = _try_lock(SCHEDULER_LOCK_FILE)
+            if _lock_handle is not None:
+                scheduler.resume()
+        else:
+            scheduler.wakeup()
+        time.sleep(SCHEDULER_POLL_SECONDS)
+
+
+def get_scheduler():
+    """
+    Returns the process-wide scheduler, starting it on first use.
+
+    A single timer thread sleeps until the next due job, so pending jobs cost
+    no threads; only a job that is actually running takes a worker. Jobs are
+    stored in SQLite and picked up again after a restart, and jobs missed
+    while the process was down run once as soon as it is back.
+
+    Every process can add and list jobs, but only one runs them (see
+    _coordinate), so a job never fires once per uvicorn worker.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                # APScheduler pulls in SQLAlchemy; import both only when the scheduler starts
+                from apscheduler.executors.pool import ThreadPoolExecutor
+                from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+                from apscheduler.schedulers.background import BackgroundScheduler
+
+                scheduler = BackgroundScheduler(
+                    jobstores={"default": SQLAlchemyJobStore(url=f"sqlite:///{SCHEDULER_DB}")},
+                    executors={"default": ThreadPoolExecutor(SCHEDULER_WORKERS)},
+                    job_defaults={"coalesce": True, "misfire_grace_time": None},
+                    timezone=timezone("Europe/Amsterdam"),
+                )
+                # Paused until this process holds the lock; jobs can still be added
+                scheduler.start(paused=True)
+                _scheduler = scheduler
+                threading.Thread(target=_coordinate, args=(scheduler,), name="scheduler-lock", daemon=True).start()
+    return _scheduler
+
+
+def schedule_at(func_ref: str, run_at: datetime, args=(), job_id=None):
+    """
+    Runs `func_ref` (a "module:function" string) once at `run_at`.
+
+    Jobs are referenced by name and their args pickled, so both must survive a
+    restart: pass plain values, not bound methods or lambdas.
+    """
+    return get_scheduler().add_job(
+        func_ref,
+        "date",
+        run_date=run_at,
+        args=list(args),
+        id=job_id,
+        replace_existing=job_id is not None,
+    )
+
+
+def schedule_in(func_ref: str, seconds: float, args=(), job_id=None):
+    run_at = datetime.now(timezone("Europe/Amsterdam")) + timedelta(seconds=seconds)
+    return schedule_at(func_ref, run_at, args, job_id)
+
+
+def schedule_every(func_ref: str, seconds: float, args=(), job_id=None):
+    """Runs `func_ref` every `seconds`; reusing a job_id replaces the old interval job."""
+    return get_scheduler().add_job(
+        func_ref,
+        "interval",
+        seconds=seconds,
+        args=list(args),
+        id=job_id,
+        replace_existing=job_id is not None,
+    )
+
+
+def list_jobs():
+    return [
+        {"id": job.id, "func": job.func_ref, "args": list(job.args), "next_run_time": job.next_run_time.isoformat()}
+        for job in get_scheduler().get_jobs()
+        if job.next_run_time
+    ]
+
+
+def shutdown():
+    global _scheduler, _lock_handle
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.shutdown(wait=False)
+            _scheduler = None
+        if _lock_handle is not None:
+            # Closing the file releases the lock for the other workers
+            _lock_handle.close()
+            _lock_handle = None
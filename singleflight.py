@@ -0,0 +1,77 @@
+import threading
+
+import metrics
+
+calls_total = metrics.Counter(
+    "singleflight_calls_total",
+    "Calls through a single-flight group; result=\"shared\" calls waited on another caller instead of going upstream.",
+    ("group", "result")
+)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Merges concurrent identical calls into one.
+
+    The first caller for a key runs the function; callers arriving with the
+    same key while it is still running wait for it and get the same result
+    (or exception). Nothing is cached: once the call finishes, the next caller
+    runs the function again.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {"leader": 0, "shared": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self.stats["leader" if leader else "shared"] += 1
+        calls_total.inc(group=self.name, result="leader" if leader else "shared")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def group(name: str):
+    """Returns the process-wide single-flight group called `name`, creating it on first use."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def get_stats():
+    """Per group: calls that went upstream (leader) and calls that were saved (shared)."""
+    with _groups_lock:
+        return {name: dict(flight.stats) for name, flight in _groups.items()}
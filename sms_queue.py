@@ -0,0 +1,220 @@
+import os
+import random
+import threading
+import time
+
+import http_client
+from notification_service import SENDER_NAME, USER_PHONE_NUMBER, VONAGE_API_KEY, VONAGE_API_SECRET
+
+VONAGE_SMS_URL = os.getenv("VONAGE_SMS_URL", "https://rest.nexmo.com/sms/json")
+# Notifications arriving within this many seconds of the first one go out as one digest
+SMS_DIGEST_WINDOW = float(os.getenv("SMS_DIGEST_WINDOW", "60"))
+# Token bucket: sustained messages per minute, and how many may go out back to back
+SMS_RATE_PER_MINUTE = float(os.getenv("SMS_RATE_PER_MINUTE", "6"))
+SMS_BURST = int(os.getenv("SMS_BURST", "3"))
+SMS_MAX_RETRIES = int(os.getenv("SMS_MAX_RETRIES", "4"))
+SMS_RETRY_BACKOFF = float(os.getenv("SMS_RETRY_BACKOFF", "2"))
+# Four concatenated SMS segments
+SMS_MAX_LENGTH = int(os.getenv("SMS_MAX_LENGTH", "612"))
+
+# Vonage statuses worth retrying: 1 = throttled, 5 = internal error
+RETRYABLE_VONAGE_STATUSES = {"1", "5"}
+
+
+class SmsError(Exception):
+    def __init__(self, message, retryable):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def send_vonage_sms(text: str):
+    """Sends one SMS through the Vonage REST API; raises SmsError on failure."""
+    try:
+        response = http_client.post(VONAGE_SMS_URL, data={
+            "api_key": VONAGE_API_KEY,
+            "api_secret": VONAGE_API_SECRET,
+            "from": SENDER_NAME,
+            "to": USER_PHONE_NUMBER,
+            "text": text,
+        })
+    except Exception as e:
+        raise SmsError(f"Could not reach Vonage: {e}", retryable=True)
+
+    if response.status_code == 429 or response.status_code >= 500:
+        raise SmsError(f"Vonage answered {response.status_code}", retryable=True)
+    if response.status_code != 200:
+        raise SmsError(f"Vonage answered {response.status_code}", retryable=False)
+
+    message = response.json()["messages"][0]
+    if message["status"] != "0":
+        raise SmsError(message.get("error-text", f"status {message['status']}"),
+                       retryable=message["status"] in RETRYABLE_VONAGE_STATUSES)
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def build_digests(texts, max_length: int = SMS_MAX_LENGTH):
+    """
+    Combines queued notifications into as few messages as possible.
+
+    Repeated texts are listed once with a count; digests are split on line
+    boundaries so none exceeds max_length.
+    """
+    counts = {}
+    for text in texts:
+        counts[text] = counts.get(text, 0) + 1
+    if len(counts) == 1:
+        text, count = next(iter(counts.items()))
+        return [text if count == 1 else f"{text} (x{count})"]
+
+    lines = [f"- {text}" if count == 1 else f"- {text} (x{count})" for text, count in counts.items()]
+    digests = []
+    current = f"{len(texts)} updates:"
+    for line in lines:
+        candidate = f"{current}\n{line}"
+        # Start a new digest only once the current one holds at least one line
+        if len(candidate) > max_length and "\n" in current:
+            digests.append(current)
+            current = line
+        else:
+            current = candidate
+    digests.append(current)
+    return [digest[:max_length] for digest in digests]
+
+
+class SmsDigestQueue:
+    """
+    Outbound SMS queue that batches, rate-limits and retries.
+
+    The first notification opens a window of SMS_DIGEST_WINDOW seconds;
+    everything queued before it closes is sent as one digest. Sends take a
+    token from a token bucket, and retryable failures are retried with
+    exponential backoff and jitter.
+    """
+
+    def __init__(self, window: float = SMS_DIGEST_WINDOW, send=send_vonage_sms):
+        self.window = window
+        self._send = send
+        self._bucket = TokenBucket(SMS_RATE_PER_MINUTE / 60, SMS_BURST)
+        self._pending = []
+        self._window_started = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {"queued": 0, "sent": 0, "coalesced": 0, "retries": 0, "failed": 0, "rate_limited_seconds": 0.0}
+        self._thread = threading.Thread(target=self._run, name="sms-digest", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, text: str):
+        with self._cond:
+            self._pending.append(text)
+            self.stats["queued"] += 1
+            if self._window_started is None:
+                self._window_started = time.monotonic()
+            self._cond.notify()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            deadline = self._window_started + self.window
+            while not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending, []
+            self._window_started = None
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            digests = build_digests(batch)
+            self.stats["coalesced"] += len(batch) - len(digests)
+            for digest in digests:
+                self._deliver(digest)
+
+    def _deliver(self, text: str):
+        for attempt in range(SMS_MAX_RETRIES + 1):
+            self.stats["rate_limited_seconds"] += self._bucket.acquire()
+            try:
+                self._send(text)
+                self.stats["sent"] += 1
+                return
+            except SmsError as e:
+                if not e.retryable or attempt == SMS_MAX_RETRIES:
+                    self.stats["failed"] += 1
+                    print(f"Failed to send SMS: {e}")
+                    return
+            except Exception as e:
+                # e.g. an unexpected response body; never let it kill the worker
+                self.stats["failed"] += 1
+                print(f"Failed to send SMS: {e}")
+                return
+            self.stats["retries"] += 1
+            time.sleep(SMS_RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    def close(self, timeout: float = 10.0):
+        """Sends whatever is queued without waiting for the window, then stops the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_sms_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = SmsDigestQueue()
+    return _queue
+
+
+def enqueue_sms(text: str):
+    """Queues a text for the next SMS digest and returns immediately."""
+    get_sms_queue().enqueue(text)
+
+
+def get_stats():
+    if _queue is None:
+        return {"queued": 0, "sent": 0, "coalesced": 0, "retries": 0, "failed": 0, "rate_limited_seconds": 0.0}
+    return dict(_queue.stats)
+
+
+def close():
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.close()
+            _queue = None
@@ -1,21 +1,104 @@
+import asyncio
 from datetime import datetime
 
 from fastapi import HTTPException
-import requests
+import http_client
 
-def notify_spotify_playback(track_uri: str, play_time: str):
-    spotify_url = "http://127.0.0.1:8000/schedule-playlist"
-    
-    params = {
+SPOTIFY_SCHEDULER_URL = "http://127.0.0.1:8000/schedule-playlist"
+# Takes {"cues": [{"playlist_uri", "play_time"}, ...]} in one POST
+SPOTIFY_BATCH_URL = "http://127.0.0.1:8000/schedule-playlists"
+
+# Set to False once the scheduler has shown it has no batch endpoint, so later
+# calls go straight to one GET per cue.
+_batch_supported = True
+
+def _playback_params(track_uri: str, play_time: str):
+    try:
+        moment = datetime.strptime(play_time, "%Y-%m-%dT%H:%M:%S%z")
+    except ValueError:
+        # Local times without an offset, e.g. anime airing times
+        moment = datetime.fromisoformat(play_time)
+    return {
         "playlist_uri": track_uri,
-        "play_time": datetime.strptime(play_time, "%Y-%m-%dT%H:%M:%S%z").strftime("%H:%M")
+        "play_time": moment.strftime("%H:%M")
     }
 
+def _unique_cues(cues):
+    """(track_uri, play_time) pairs -> request params, dropping cues that resolve to the same playlist and minute."""
+    unique = {}
+    for track_uri, play_time in cues:
+        params = _playback_params(track_uri, play_time)
+        unique.setdefault((params["playlist_uri"], params["play_time"]), params)
+    return list(unique.values())
+
+def notify_spotify_playback(track_uri: str, play_time: str):
+    params = _playback_params(track_uri, play_time)
+
     try:
-        response = requests.get(spotify_url, params=params)
+        response = http_client.get(SPOTIFY_SCHEDULER_URL, params=params)
         
         if response.status_code != 200:
             raise HTTPException(status_code=500, detail="Failed to schedule Spotify playback")
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Error scheduling Spotify playback")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error scheduling Spotify playback")
+
+def schedule_playback_cues(cues):
+    """
+    Schedules many (track_uri, play_time) cues with one request to the playlist scheduler.
+
+    Identical cues are sent once. Falls back to one GET per cue when the
+    scheduler has no batch endpoint. Returns the number of cues scheduled.
+    """
+    global _batch_supported
+    unique = _unique_cues(cues)
+    if not unique:
+        return 0
+
+    try:
+        if _batch_supported:
+            response = http_client.post(SPOTIFY_BATCH_URL, json={"cues": unique})
+            if response.status_code in (404, 405):
+                _batch_supported = False
+            elif response.status_code != 200:
+                raise HTTPException(status_code=500, detail="Failed to schedule Spotify playback")
+            else:
+                return len(unique)
+
+        for params in unique:
+            response = http_client.get(SPOTIFY_SCHEDULER_URL, params=params)
+            if response.status_code != 200:
+                raise HTTPException(status_code=500, detail="Failed to schedule Spotify playback")
+        return len(unique)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=500, detail="Error scheduling Spotify playback")
+
+async def schedule_playback_cues_async(cues):
+    """Async counterpart of schedule_playback_cues; the per-cue fallback sends all cues concurrently."""
+    global _batch_supported
+    unique = _unique_cues(cues)
+    if not unique:
+        return 0
+
+    try:
+        if _batch_supported:
+            status, _ = await http_client.fetch_json("POST", SPOTIFY_BATCH_URL, json={"cues": unique})
+            if status in (404, 405):
+                _batch_supported = False
+            elif status != 200:
+                raise HTTPException(status_code=500, detail="Failed to schedule Spotify playback")
+            else:
+                return len(unique)
+
+        results = await asyncio.gather(*(
+            http_client.fetch_json("GET", SPOTIFY_SCHEDULER_URL, params=params) for params in unique
+        ))
+        if any(status != 200 for status, _ in results):
+            raise HTTPException(status_code=500, detail="Failed to schedule Spotify playback")
+        return len(unique)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=500, detail="Error scheduling Spotify playback")
@@ -1,24 +1,119 @@
+import asyncio
+from datetime import datetime
+from typing import Optional
+import threading
+import time
+
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from fastapi import HTTPException
-import requests
+import http_client
 import os
+import singleflight
 
 load_dotenv()
 
-def fetch_weather(city: str):
-    api_key = os.getenv("WEATHER_API_KEY")
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-    
-    response = requests.get(url)
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch weather data")
-    
-    data = response.json()
-    weather_info = {
+WEATHER_API_URL = "http://api.openweathermap.org/data/2.5"
+# The 5-day/3-hour forecast only changes every few hours upstream
+FORECAST_CACHE_TTL = int(os.getenv("WEATHER_FORECAST_CACHE_TTL", "1800"))
+CURRENT_CACHE_TTL = int(os.getenv("WEATHER_CURRENT_CACHE_TTL", "600"))
+
+_forecast_cache = TTLCache(maxsize=256, ttl=FORECAST_CACHE_TTL)
+_current_cache = TTLCache(maxsize=256, ttl=CURRENT_CACHE_TTL)
+_cache_lock = threading.Lock()
+# Concurrent misses for the same city share one OpenWeatherMap call
+_inflight = singleflight.group("openweathermap")
+
+
+def normalize_city(city: str):
+    return " ".join(city.split()).casefold()
+
+
+def _weather_info(data: dict):
+    return {
         "temperature": data["main"]["temp"],
         "weather": data["weather"][0]["description"],
         "wind_speed": data["wind"]["speed"],
         "humidity": data["main"]["humidity"]
     }
-    
-    return weather_info
\ No newline at end of file
+
+
+def _get_json(endpoint: str, city: str):
+    api_key = os.getenv("WEATHER_API_KEY")
+    response = http_client.get(
+        f"{WEATHER_API_URL}/{endpoint}",
+        params={"q": city, "appid": api_key, "units": "metric"}
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="Failed to fetch weather data")
+    return response.json()
+
+
+def fetch_current_weather(city: str):
+    key = normalize_city(city)
+    with _cache_lock:
+        cached = _current_cache.get(key)
+    if cached is not None:
+        return cached
+
+    def load():
+        weather_info = _weather_info(_get_json("weather", city))
+        with _cache_lock:
+            _current_cache[key] = weather_info
+        return weather_info
+
+    return _inflight.do(("weather", key), load)
+
+
+def fetch_forecast(city: str):
+    """Returns the cached forecast grid for a city as sorted (unix time, weather info) pairs."""
+    key = normalize_city(city)
+    with _cache_lock:
+        cached = _forecast_cache.get(key)
+    if cached is not None:
+        return cached
+
+    def load():
+        data = _get_json("forecast", city)
+        points = sorted((entry["dt"], _weather_info(entry)) for entry in data.get("list", []))
+        with _cache_lock:
+            _forecast_cache[key] = points
+        return points
+
+    return _inflight.do(("forecast", key), load)
+
+
+def _interpolate(points, timestamp: float):
+    """Linearly interpolates the numeric fields between the two surrounding forecast points."""
+    for (t0, before), (t1, after) in zip(points, points[1:]):
+        if t0 <= timestamp <= t1:
+            fraction = (timestamp - t0) / (t1 - t0) if t1 != t0 else 0
+            nearest = before if fraction < 0.5 else after
+            return {
+                "temperature": round(before["temperature"] + (after["temperature"] - before["temperature"]) * fraction, 1),
+                "weather": nearest["weather"],
+                "wind_speed": round(before["wind_speed"] + (after["wind_speed"] - before["wind_speed"]) * fraction, 1),
+                "humidity": round(before["humidity"] + (after["humidity"] - before["humidity"]) * fraction)
+            }
+    return None
+
+
+def fetch_weather(city: str, at: Optional[datetime] = None):
+    """
+    Returns the weather for a city, at a given time if one is passed.
+
+    Times covered by the 5-day forecast are answered from the cached forecast
+    grid; anything else (including no time at all) uses the current weather.
+    """
+    if at is not None and at.timestamp() > time.time():
+        points = fetch_forecast(city)
+        weather_info = _interpolate(points, at.timestamp())
+        if weather_info is not None:
+            return weather_info
+
+    return fetch_current_weather(city)
+
+
+async def fetch_weather_async(city: str, at: Optional[datetime] = None):
+    """fetch_weather for async handlers; the cached lookup runs in a worker thread."""
+    return await asyncio.to_thread(fetch_weather, city, at)